@@ -22,12 +22,15 @@ from .config import settings
 
 _agent_config_cache: Dict[str, Any] = {"mtime": None, "config": None}
 
+_JSONC_LINE_RE = re.compile(r"//.*?$", re.MULTILINE)
+_JSONC_BLOCK_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_ENV_VAR_RE = re.compile(r"\{env:([^}]+)\}")
+_FILE_VAR_RE = re.compile(r"\{file:([^}]+)\}")
+
 
 def _strip_jsonc(text: str) -> str:
     # Remove // and /* */ comments (best-effort).
-    text = re.sub(r"//.*?$", "", text, flags=re.MULTILINE)
-    text = re.sub(r"/\\*.*?\\*/", "", text, flags=re.DOTALL)
-    return text
+    return _JSONC_BLOCK_RE.sub("", _JSONC_LINE_RE.sub("", text))
 
 
 def _replace_vars(text: str, base_dir: Path) -> str:
@@ -45,9 +48,8 @@ def _replace_vars(text: str, base_dir: Path) -> str:
         except Exception:
             return ""
 
-    text = re.sub(r"\{env:([^}]+)\}", repl_env, text)
-    text = re.sub(r"\{file:([^}]+)\}", repl_file, text)
-    return text
+    text = _ENV_VAR_RE.sub(repl_env, text)
+    return _FILE_VAR_RE.sub(repl_file, text)
 
 
 def _substitute_vars(value: Any, base_dir: Path) -> Any:
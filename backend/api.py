@@ -128,7 +128,9 @@ except ImportError:
 # 注册 Diet 识别与饮食记录路由
 try:
     from .diet.api import router as diet_router
+    from .diet.vision import close_clients as close_vision_clients
     app.include_router(diet_router)
+    app.on_event("shutdown")(close_vision_clients)
 except ImportError:
     pass  # Diet module not available
 
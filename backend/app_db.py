@@ -8,8 +8,14 @@ from __future__ import annotations
 
 import sqlite3
 from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Iterator
+from typing import AsyncIterator, Iterator, Optional, Tuple
+
+from .config import settings
+
+# Connection shared by all db_conn() blocks of the current request (see get_request_conn).
+_request_conn: ContextVar[Optional[Tuple[Path, sqlite3.Connection]]] = ContextVar("_request_conn", default=None)
 
 
 def connect(db_path: Path) -> sqlite3.Connection:
@@ -17,12 +23,20 @@ def connect(db_path: Path) -> sqlite3.Connection:
     conn = sqlite3.connect(str(db_path), check_same_thread=False)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
+    # Per-connection settings; journal_mode=WAL is persisted in the DB file by init_app_db.
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute("PRAGMA busy_timeout = 5000;")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    conn.execute("PRAGMA mmap_size = 268435456;")
     return conn
 
 
 def init_app_db(db_path: Path) -> None:
     conn = connect(db_path)
     try:
+        # WAL + synchronous=NORMAL: chat requests commit many small rows, and WAL avoids a
+        # rollback-journal fsync per commit while staying crash-safe.
+        conn.execute("PRAGMA journal_mode = WAL;")
         cur = conn.cursor()
         cur.execute(
             """
@@ -51,6 +65,10 @@ def init_app_db(db_path: Path) -> None:
         cur.execute(
             "CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_agent_updated ON chat_sessions(user_id, agent_id, updated_at DESC);"
         )
+        # list_sessions without an agent filter orders by updated_at for the user only.
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_updated ON chat_sessions(user_id, updated_at DESC);"
+        )
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS chat_messages (
@@ -119,6 +137,9 @@ def init_app_db(db_path: Path) -> None:
             );
             """
         )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_session_artifacts_session_created ON session_artifacts(session_id, created_at DESC);"
+        )
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS plans (
@@ -142,13 +163,74 @@ def init_app_db(db_path: Path) -> None:
         cur.execute(
             "CREATE INDEX IF NOT EXISTS idx_plans_user_patient_type_status_created ON plans(user_id, patient_id, plan_type, status, created_at DESC);"
         )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS clinical_records (
+                record_id BLOB PRIMARY KEY,
+                patient_id TEXT NOT NULL,
+                record_type TEXT NOT NULL,
+                recorded_at TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                record_json TEXT NOT NULL
+            );
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_clinical_records_patient_type_recorded ON clinical_records(patient_id, record_type, recorded_at DESC);"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_clinical_records_patient_recorded ON clinical_records(patient_id, recorded_at DESC);"
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS diet_entries (
+                entry_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                device_id TEXT NOT NULL,
+                eaten_at TEXT NOT NULL,
+                meal_type TEXT NOT NULL,
+                plan_id TEXT,
+                calories_kcal REAL NOT NULL DEFAULT 0,
+                protein_g REAL NOT NULL DEFAULT 0,
+                carbs_g REAL NOT NULL DEFAULT 0,
+                fat_g REAL NOT NULL DEFAULT 0,
+                entry_json TEXT NOT NULL
+            );
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_diet_lookup ON diet_entries(user_id, device_id, eaten_at DESC, plan_id);"
+        )
         conn.commit()
     finally:
         conn.close()
 
 
+async def get_request_conn() -> AsyncIterator[sqlite3.Connection]:
+    """FastAPI dependency: open one app DB connection and reuse it for the whole request."""
+    conn = connect(settings.app_db_path)
+    token = _request_conn.set((settings.app_db_path, conn))
+    try:
+        yield conn
+    finally:
+        _request_conn.reset(token)
+        conn.close()
+
+
 @contextmanager
 def db_conn(db_path: Path) -> Iterator[sqlite3.Connection]:
+    shared = _request_conn.get()
+    if shared is not None and shared[0] == db_path:
+        # Each block still commits (or rolls back) on its own, but the connection stays open.
+        conn = shared[1]
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return
+
     conn = connect(db_path)
     try:
         yield conn
@@ -3,15 +3,18 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import json
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 
+from ..app_db import get_request_conn
 from ..artifacts.models import ArtifactCategory, ArtifactListItem
 from ..auth.security import get_current_user
-from .context import build_agent_context
+from .context import build_agent_context, render_agent_context
 from .models import (
     ChatMessage,
     ChatMessageCreateRequest,
@@ -36,13 +39,27 @@ from .storage import (
     update_session_title_if_first_user_message,
 )
 
-router = APIRouter(prefix="/api/chat", tags=["Chat"])
+router = APIRouter(prefix="/api/chat", tags=["Chat"], dependencies=[Depends(get_request_conn)])
+
+# Direct value -> member lookup; avoids Enum.__call__ overhead per attached artifact row.
+_ARTIFACT_CATEGORY: Dict[str, ArtifactCategory] = {c.value: c for c in ArtifactCategory}
+
+# Strong refs for fire-and-forget persistence tasks (the event loop only keeps weak refs).
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _persist_in_background(func: Any, /, **kwargs: Any) -> None:
+    # Run in an empty context so the task opens its own DB connection instead of sharing the
+    # request-scoped one, which may be closed before the task finishes.
+    task = asyncio.create_task(asyncio.to_thread(contextvars.Context().run, func, **kwargs))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 
 def _artifact_item(row: Dict[str, Any]) -> ArtifactListItem:
     return ArtifactListItem(
         id=row["id"],
-        category=ArtifactCategory(row["category"]),
+        category=_ARTIFACT_CATEGORY[row["category"]],
         title=row.get("title"),
         filename=row.get("filename"),
         content_type=row.get("content_type"),
@@ -122,53 +139,45 @@ def detach_artifact_api(session_id: str, artifact_id: str, user: dict = Depends(
     return {"status": "ok"}
 
 
+def _text_of_part(part: Any) -> str | None:
+    if isinstance(part, dict) and part.get("type") == "text":
+        text = part.get("text")
+        if isinstance(text, str):
+            return text
+    return None
+
+
 def _collect_text_parts(parts: Any) -> str:
     if not isinstance(parts, list):
         return ""
-    out: list[str] = []
-    for part in parts:
-        if isinstance(part, dict) and part.get("type") == "text" and isinstance(part.get("text"), str):
-            out.append(part["text"])
-    return "".join(out)
+    # Most SSE events carry a single part; skip the generator/join for that case.
+    if len(parts) == 1:
+        return _text_of_part(parts[0]) or ""
+    return "".join(t for t in map(_text_of_part, parts) if t)
 
 
 def _extract_opencode_delta(event: Any) -> str:
-    if not isinstance(event, dict):
-        return ""
-    if isinstance(event.get("answer"), str):
-        return event["answer"]
-    parts = event.get("parts")
-    if isinstance(parts, list):
-        return _collect_text_parts(parts)
-    msg = event.get("message")
-    if isinstance(msg, dict) and isinstance(msg.get("parts"), list):
-        return _collect_text_parts(msg.get("parts"))
-    data = event.get("data")
-    if isinstance(data, dict) and isinstance(data.get("parts"), list):
-        return _collect_text_parts(data.get("parts"))
+    match event:
+        case {"answer": str(answer)}:
+            return answer
+        case {"parts": list(parts)}:
+            return _collect_text_parts(parts)
+        case {"message": {"parts": list(parts)}} | {"data": {"parts": list(parts)}}:
+            return _collect_text_parts(parts)
     return ""
 
 
 def _extract_opencode_error(event: Any) -> str:
-    if not isinstance(event, dict):
-        return ""
-    err = event.get("error")
-    if isinstance(err, dict):
-        msg = err.get("message") or err.get("detail") or err.get("error")
-        if isinstance(msg, str):
-            return msg
-    info = event.get("info")
-    if isinstance(info, dict):
-        err = info.get("error")
-        if isinstance(err, dict):
-            data = err.get("data")
-            if isinstance(data, dict):
-                msg = data.get("message")
-                if isinstance(msg, str):
-                    return msg
-            msg = err.get("message")
+    match event:
+        case {"error": dict(err)}:
+            msg = err.get("message") or err.get("detail") or err.get("error")
             if isinstance(msg, str):
                 return msg
+    match event:
+        case {"info": {"error": {"data": {"message": str(msg)}}}}:
+            return msg
+        case {"info": {"error": {"message": str(msg)}}}:
+            return msg
     return ""
 
 
@@ -177,6 +186,7 @@ async def send_chat_message(
     session_id: str,
     request_body: ChatMessageCreateRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     user: dict = Depends(get_current_user),
 ):
     session = require_session(user_id=user["id"], session_id=session_id)
@@ -187,7 +197,7 @@ async def send_chat_message(
 
     # Persist user message first.
     append_message(session_id=session_id, role="user", content=content)
-    update_session_title_if_first_user_message(session_id=session_id, title=content[:16])
+    _persist_in_background(update_session_title_if_first_user_message, session_id=session_id, title=content[:16])
 
     # Assemble context (includes auto history data + artifacts).
     ctx = build_agent_context(
@@ -197,14 +207,14 @@ async def send_chat_message(
         extra_artifact_ids=request_body.attachments or None,
     )
 
-    full_prompt = f"Context (JSON):\n{json.dumps(ctx, ensure_ascii=False)}\n\nQuestion:\n{content}"
+    full_prompt = f"Context (JSON):\n{render_agent_context(ctx)}\n\nQuestion:\n{content}"
     wants_stream = "text/event-stream" in (request.headers.get("accept") or "")
 
     def fallback_answer(detail: str) -> JSONResponse:
         # For non-streaming callers (e.g. mobile apps), return a friendly 200 response
         # instead of a hard 502 so UI won't briefly flash an error toast then disappear.
         answer = f"AI 服务不可用：{detail}"
-        append_message(session_id=session_id, role="assistant", content=answer)
+        background_tasks.add_task(append_message, session_id=session_id, role="assistant", content=answer)
         return JSONResponse(content=ChatMessageCreateResponse(status="ok", answer=answer).model_dump())
 
     # Ensure OpenCode session id.
@@ -304,8 +314,9 @@ async def send_chat_message(
                     await resp.aclose()
                 finally:
                     await client.aclose()
+                # Persist after the stream closes so the DB write is not on the client's critical path.
                 if full_text.strip():
-                    append_message(session_id=session_id, role="assistant", content=full_text)
+                    _persist_in_background(append_message, session_id=session_id, role="assistant", content=full_text)
         return StreamingResponse(stream(), media_type="text/event-stream")
 
     # Non-stream response (JSON-ish from OpenCode).
@@ -329,5 +340,5 @@ async def send_chat_message(
             raise HTTPException(status_code=502, detail="OpenCode returned empty response")
         return fallback_answer("OpenCode returned empty response")
 
-    append_message(session_id=session_id, role="assistant", content=answer_text)
+    background_tasks.add_task(append_message, session_id=session_id, role="assistant", content=answer_text)
     return JSONResponse(content=ChatMessageCreateResponse(status="ok", answer=answer_text).model_dump())
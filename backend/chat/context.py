@@ -11,9 +11,12 @@ Builds the JSON context passed to OpenCode/Qwen based on:
 
 from __future__ import annotations
 
+import json
 from datetime import date, timedelta
 from typing import Any, Dict, Iterable, List, Optional
 
+import orjson
+
 from ..artifacts.storage import (
     get_artifact_row,
     list_artifacts,
@@ -167,3 +170,12 @@ def build_agent_context(
         "raw_texts": raw_texts,
         "output_format": "markdown",
     }
+
+
+def render_agent_context(ctx: Dict[str, Any]) -> str:
+    """Serialize the context once for the prompt (raw_texts can be tens of KB)."""
+    try:
+        return orjson.dumps(ctx, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    except TypeError:
+        # orjson rejects a few shapes json accepts (e.g. >64-bit ints); keep the old path for those.
+        return json.dumps(ctx, ensure_ascii=False)
@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
-"""Chat — DB storage helpers."""
+"""Chat — DB storage helpers.
+
+List queries are backed by composite indices created in ``app_db.init_app_db``
+(sessions by user/agent/updated_at, messages by session/created_at, session
+attachments by session/created_at) so ORDER BY ... LIMIT needs no sort step.
+"""
 
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import time
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
@@ -14,7 +19,9 @@ from ..config import settings
 
 
 def _utc_now() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    # Same shape as datetime.isoformat() + "Z", without building a datetime per call.
+    t = time.time()
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t)) + f".{int(t % 1 * 1e6):06d}Z"
 
 
 def create_session(*, user_id: str, agent_id: str, title: str) -> Dict[str, Any]:
@@ -124,6 +131,7 @@ def list_messages(*, session_id: str, limit: int = 200) -> List[Dict[str, Any]]:
 
 
 def attach_artifact(*, user_id: str, session_id: str, artifact_id: str) -> None:
+    now = _utc_now()
     with db_conn(settings.app_db_path) as conn:
         srow = conn.execute(
             "SELECT id FROM chat_sessions WHERE id = ? AND user_id = ?",
@@ -139,12 +147,13 @@ def attach_artifact(*, user_id: str, session_id: str, artifact_id: str) -> None:
             raise HTTPException(status_code=404, detail="Artifact not found")
         conn.execute(
             "INSERT OR IGNORE INTO session_artifacts (session_id, artifact_id, created_at) VALUES (?, ?, ?)",
-            (session_id, artifact_id, _utc_now()),
+            (session_id, artifact_id, now),
         )
-        conn.execute("UPDATE chat_sessions SET updated_at = ? WHERE id = ?", (_utc_now(), session_id))
+        conn.execute("UPDATE chat_sessions SET updated_at = ? WHERE id = ?", (now, session_id))
 
 
 def detach_artifact(*, user_id: str, session_id: str, artifact_id: str) -> None:
+    now = _utc_now()
     with db_conn(settings.app_db_path) as conn:
         srow = conn.execute(
             "SELECT id FROM chat_sessions WHERE id = ? AND user_id = ?",
@@ -156,7 +165,7 @@ def detach_artifact(*, user_id: str, session_id: str, artifact_id: str) -> None:
             "DELETE FROM session_artifacts WHERE session_id = ? AND artifact_id = ?",
             (session_id, artifact_id),
         )
-        conn.execute("UPDATE chat_sessions SET updated_at = ? WHERE id = ?", (_utc_now(), session_id))
+        conn.execute("UPDATE chat_sessions SET updated_at = ? WHERE id = ?", (now, session_id))
 
 
 def list_attached_artifacts(*, user_id: str, session_id: str) -> List[Dict[str, Any]]:
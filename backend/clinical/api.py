@@ -3,15 +3,21 @@
 
 from __future__ import annotations
 
+import asyncio
 from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 
 from ..auth.security import get_current_user
 from .models import (
     ClinicalRecordCreateRequest,
     ClinicalRecordCreateResponse,
     ClinicalRecordType,
+    ClinicalRecordsBulkCreateRequest,
+    ClinicalRecordsBulkCreateResponse,
     ClinicalRecordsResponse,
     ClinicalSubject,
     ClinicalSubjectUpsertRequest,
@@ -19,11 +25,12 @@ from .models import (
 )
 from .storage import (
     create_record,
+    create_records,
     delete_record,
     get_record,
     get_subject,
+    iter_records_json,
     latest_record,
-    list_records,
     list_subjects,
     upsert_subject,
 )
@@ -31,60 +38,116 @@ from .storage import (
 router = APIRouter(prefix="/api/clinical", tags=["Clinical"])
 
 
+def _orjson_response(content: Any) -> Response:
+    # Untyped endpoints: serialize once in C instead of jsonable_encoder + json.dumps.
+    return Response(content=orjson.dumps(content), media_type="application/json")
+
+
+def _require_self(patient_id: str, user: dict = Depends(get_current_user)) -> dict:
+    """Path-scoped guard: personal mode only exposes the caller's own patient_id."""
+    if patient_id != user["id"]:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return user
+
+
+async def _body_json(request: Request) -> Any:
+    # FastAPI has already parsed the JSON body by now; request.json() returns the cached value.
+    try:
+        return await request.json()
+    except ValueError:
+        return None  # Leave malformed bodies to FastAPI's usual 422.
+
+
+async def _require_self_body(request: Request, user: dict = Depends(get_current_user)) -> dict:
+    """Body-scoped guard: peek at the top-level `patient_id` before the body model is validated."""
+    payload = await _body_json(request)
+    if isinstance(payload, dict) and "patient_id" in payload and payload["patient_id"] != user["id"]:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return user
+
+
+async def _require_self_bulk(request: Request, user: dict = Depends(get_current_user)) -> dict:
+    """`_require_self_body` for bulk bodies: every item's `patient_id` must be the caller's."""
+    payload = await _body_json(request)
+    records = payload.get("records") if isinstance(payload, dict) else None
+    if isinstance(records, list):
+        for item in records:
+            if isinstance(item, dict) and "patient_id" in item and item["patient_id"] != user["id"]:
+                raise HTTPException(status_code=403, detail="Forbidden")
+    return user
+
+
 @router.post("/subjects", response_model=ClinicalSubject, summary="Upsert a clinical subject (patient)")
-def upsert_subject_api(request: ClinicalSubjectUpsertRequest, user: dict = Depends(get_current_user)):
+async def upsert_subject_api(request: ClinicalSubjectUpsertRequest, user: dict = Depends(_require_self_body)):
     if request.patient_id != user["id"]:
         raise HTTPException(status_code=403, detail="Forbidden")
-    return upsert_subject(request)
+    return await asyncio.to_thread(upsert_subject, request)
 
 
 @router.get("/subjects/{patient_id}", response_model=ClinicalSubject, summary="Get a clinical subject")
-def get_subject_api(patient_id: str, user: dict = Depends(get_current_user)):
-    if patient_id != user["id"]:
-        raise HTTPException(status_code=403, detail="Forbidden")
-    subject = get_subject(patient_id)
+async def get_subject_api(patient_id: str, user: dict = Depends(_require_self)):
+    subject = await asyncio.to_thread(get_subject, patient_id)
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
     return subject
 
 
 @router.get("/subjects", response_model=ClinicalSubjectsResponse, summary="List clinical subjects")
-def list_subjects_api(
+async def list_subjects_api(
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
     user: dict = Depends(get_current_user),
 ):
     # Personal-mode: only expose current user.
-    subject = get_subject(user["id"])
+    subject = await asyncio.to_thread(get_subject, user["id"])
     subjects = [subject] if subject else []
     return ClinicalSubjectsResponse(count=len(subjects), subjects=subjects)
 
 
 @router.post("/records", response_model=ClinicalRecordCreateResponse, summary="Create a clinical record")
-def create_record_api(request: ClinicalRecordCreateRequest, user: dict = Depends(get_current_user)):
+async def create_record_api(request: ClinicalRecordCreateRequest, user: dict = Depends(_require_self_body)):
     if request.patient_id != user["id"]:
         raise HTTPException(status_code=403, detail="Forbidden")
     # Make sure a subject exists (minimum info) to keep data discoverable.
-    if not get_subject(request.patient_id):
-        upsert_subject(ClinicalSubjectUpsertRequest(patient_id=request.patient_id))
+    if not await asyncio.to_thread(get_subject, request.patient_id):
+        await asyncio.to_thread(upsert_subject, ClinicalSubjectUpsertRequest(patient_id=request.patient_id))
 
-    record = create_record(request)
+    record = await asyncio.to_thread(create_record, request)
     return ClinicalRecordCreateResponse(record_id=record.record_id, saved_at=record.created_at)
 
 
+@router.post(
+    "/records/bulk",
+    response_model=ClinicalRecordsBulkCreateResponse,
+    summary="Create many clinical records in one transaction",
+)
+async def create_records_api(request: ClinicalRecordsBulkCreateRequest, user: dict = Depends(_require_self_bulk)):
+    if any(rec.patient_id != user["id"] for rec in request.records):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if not await asyncio.to_thread(get_subject, user["id"]):
+        await asyncio.to_thread(upsert_subject, ClinicalSubjectUpsertRequest(patient_id=user["id"]))
+
+    records = await asyncio.to_thread(create_records, request.records)
+    return ClinicalRecordsBulkCreateResponse(
+        count=len(records),
+        records=[ClinicalRecordCreateResponse(record_id=r.record_id, saved_at=r.created_at) for r in records],
+    )
+
+
 @router.get("/records/{patient_id}", response_model=ClinicalRecordsResponse, summary="List clinical records")
-def list_records_api(
+async def list_records_api(
     patient_id: str,
     record_type: ClinicalRecordType | None = Query(default=None),
     start: str | None = Query(default=None, description="YYYY-MM-DD"),
     end: str | None = Query(default=None, description="YYYY-MM-DD"),
     limit: int = Query(default=100, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(_require_self),
 ):
-    if patient_id != user["id"]:
-        raise HTTPException(status_code=403, detail="Forbidden")
-    items = list_records(
+    # Runs the legacy import and the first fetch before any bytes go out, so failures are a 5xx
+    # rather than a truncated 200.
+    batches = await asyncio.to_thread(
+        iter_records_json,
         patient_id,
         record_type=record_type,
         start=start,
@@ -92,51 +155,44 @@ def list_records_api(
         limit=limit,
         offset=offset,
     )
-    return ClinicalRecordsResponse(patient_id=patient_id, count=len(items), records=items)
+    return StreamingResponse(_records_body(patient_id, batches), media_type="application/json")
+
+
+def _records_body(patient_id: str, batches: Iterator[List[str]]) -> Iterator[bytes]:
+    # Stored rows are already ClinicalRecord JSON: splice them into the ClinicalRecordsResponse
+    # shape as they come off the cursor. `count` goes last since it is only known at the end.
+    yield b'{"patient_id":' + orjson.dumps(patient_id) + b',"records":['
+    count = 0
+    for batch in batches:
+        yield (b"," if count else b"") + ",".join(batch).encode("utf-8")
+        count += len(batch)
+    yield b'],"count":%d}' % count
 
 
 @router.get("/records/{patient_id}/{record_id}", summary="Get a clinical record")
-def get_record_api(patient_id: str, record_id: str, user: dict = Depends(get_current_user)):
-    if patient_id != user["id"]:
-        raise HTTPException(status_code=403, detail="Forbidden")
-    record = get_record(patient_id, record_id)
+async def get_record_api(patient_id: str, record_id: str, user: dict = Depends(_require_self)):
+    record = await asyncio.to_thread(get_record, patient_id, record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
-    return record
+    return Response(content=record.model_dump_json(), media_type="application/json")
 
 
 @router.delete("/records/{patient_id}/{record_id}", summary="Delete a clinical record")
-def delete_record_api(patient_id: str, record_id: str, user: dict = Depends(get_current_user)):
-    if patient_id != user["id"]:
-        raise HTTPException(status_code=403, detail="Forbidden")
-    ok = delete_record(patient_id, record_id)
+async def delete_record_api(patient_id: str, record_id: str, user: dict = Depends(_require_self)):
+    ok = await asyncio.to_thread(delete_record, patient_id, record_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Record not found")
     return {"status": "ok", "record_id": record_id}
 
 
-@router.get("/context/{patient_id}", summary="Clinical context for agents (subject + latest CPET + optional lifestyle)")
-def get_clinical_context(
-    patient_id: str,
-    days: int = Query(default=7, ge=1, le=30),
-    device: str = Query(default="all", description="all or a specific device_id"),
-    merge: str = Query(default="sum", pattern="^(sum|max)$", description="merge strategy across devices"),
-    user: dict = Depends(get_current_user),
-):
-    if patient_id != user["id"]:
-        raise HTTPException(status_code=403, detail="Forbidden")
-    subject = get_subject(patient_id)
-    latest_cpet = latest_record(patient_id, ClinicalRecordType.cpet_report)
-
-    lifestyle = None
-    linked_device_ids = subject.linked_device_ids if subject else []
+def _lifestyle_or_none(user_id: str, patient_id: str, *, days: int, device: str, merge: str) -> Optional[Dict[str, Any]]:
     try:
         from ..lifestyle.storage import get_patient_lifestyle_summary
 
         end = date.today()
         start = end - timedelta(days=days - 1)
-        lifestyle = get_patient_lifestyle_summary(
-            user["id"],
+        return get_patient_lifestyle_summary(
+            user_id,
             patient_id,
             start=start.isoformat(),
             end=end.isoformat(),
@@ -144,13 +200,32 @@ def get_clinical_context(
             merge=merge,
         )
     except Exception:
-        lifestyle = None
-
-    return {
-        "patient": subject.model_dump() if subject else {"patient_id": patient_id},
-        "latest_cpet": latest_cpet.model_dump() if latest_cpet else None,
-        "linked_device_ids": linked_device_ids,
-        "device_filter": device,
-        "merge_strategy": merge,
-        "lifestyle": lifestyle,
-    }
+        return None
+
+
+@router.get("/context/{patient_id}", summary="Clinical context for agents (subject + latest CPET + optional lifestyle)")
+async def get_clinical_context(
+    patient_id: str,
+    days: int = Query(default=7, ge=1, le=30),
+    device: str = Query(default="all", description="all or a specific device_id"),
+    merge: str = Query(default="sum", pattern="^(sum|max)$", description="merge strategy across devices"),
+    user: dict = Depends(_require_self),
+):
+    # Independent blocking reads; run them concurrently off the event loop.
+    subject, latest_cpet, lifestyle = await asyncio.gather(
+        asyncio.to_thread(get_subject, patient_id),
+        asyncio.to_thread(latest_record, patient_id, ClinicalRecordType.cpet_report),
+        asyncio.to_thread(_lifestyle_or_none, user["id"], patient_id, days=days, device=device, merge=merge),
+    )
+    linked_device_ids = subject.linked_device_ids if subject else []
+
+    return _orjson_response(
+        {
+            "patient": subject.model_dump() if subject else {"patient_id": patient_id},
+            "latest_cpet": latest_cpet.model_dump() if latest_cpet else None,
+            "linked_device_ids": linked_device_ids,
+            "device_filter": device,
+            "merge_strategy": merge,
+            "lifestyle": lifestyle,
+        }
+    )
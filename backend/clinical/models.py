@@ -3,7 +3,7 @@
 
 Design goals:
 - Store clinical records (e.g. CPET report) as structured JSON, keyed by patient_id.
-- Keep storage simple (JSON files) for easy local deployment.
+- Keep storage simple (JSON files + the app SQLite DB) for easy local deployment.
 - Allow linking one patient to one or more device_id values (for lifestyle aggregation).
 """
 
@@ -83,6 +83,15 @@ class ClinicalRecordCreateResponse(BaseModel):
     saved_at: str
 
 
+class ClinicalRecordsBulkCreateRequest(BaseModel):
+    records: List[ClinicalRecordCreateRequest] = Field(..., min_length=1, max_length=500)
+
+
+class ClinicalRecordsBulkCreateResponse(BaseModel):
+    count: int
+    records: List[ClinicalRecordCreateResponse]
+
+
 class ClinicalRecordsResponse(BaseModel):
     patient_id: str
     count: int
@@ -1,15 +1,29 @@
 # -*- coding: utf-8 -*-
-"""Clinical records — JSON file storage."""
+"""Clinical records — subjects as JSON files, records in the app DB.
+
+Records live in the ``clinical_records`` table (full record JSON in ``record_json``), so
+listing/filtering by patient, type and date is a single indexed query. Record files from
+older versions are imported on first access.
+"""
 
 from __future__ import annotations
 
-import json
+import os
 import re
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
-from uuid import uuid4
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from uuid import UUID, uuid4
+
+import orjson
 
+from ..app_db import db_conn
+from ..config import settings
 from .models import (
     ClinicalRecord,
     ClinicalRecordCreateRequest,
@@ -21,39 +35,96 @@ from .models import (
 _DATA_ROOT = Path(__file__).resolve().parent.parent.parent / "data" / "clinical"
 _SUBJECTS_DIR = _DATA_ROOT / "subjects"
 _RECORDS_DIR = _DATA_ROOT / "records"
+_UNSAFE_KEY_RE = re.compile(r"[^\w.\-@]+")
+
+# Patients whose legacy record files have been imported in this process.
+_indexed_patients: Set[str] = set()
+
+# Short-lived read cache for get_subject/latest_record (hot per-patient keys in personal mode).
+# Entries hold the stored JSON, validated into a fresh model on every hit, so callers never share
+# a model. Writes through this module invalidate the patient's entries before and after the write
+# and bump the patient's generation; a read that started before the bump cannot cache what it
+# read. The TTL bounds staleness when several worker processes share the same data. Eviction
+# follows TTLCache(maxsize): expired entries first, then the oldest.
+_CACHE_TTL_SEC = 2.0
+_CACHE_MAX_ENTRIES = 1024
+_cache: Dict[Tuple[str, str, str], Tuple[float, Any]] = {}
+_cache_generations: Dict[str, int] = {}
+_cache_lock = threading.Lock()
+_MISS = object()
 
 
 def _ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+@lru_cache(maxsize=1024)
 def _safe_key(value: str) -> str:
     # Keep it filesystem-safe without changing semantics too much.
     # Replace path separators and any unusual characters.
-    cleaned = re.sub(r"[^\w.\-@]+", "_", value.strip())
+    # Cached: the same handful of patient ids hit this on every storage call.
+    cleaned = _UNSAFE_KEY_RE.sub("_", value.strip())
     cleaned = cleaned.replace("/", "_").replace("\\", "_")
     if cleaned in {"", ".", ".."}:
         cleaned = "unknown"
     return cleaned[:200]
 
 
+def _cache_get(key: Tuple[str, str, str]) -> Any:
+    with _cache_lock:
+        hit = _cache.get(key)
+    if hit is None or hit[0] < time.monotonic():
+        return _MISS
+    return hit[1]
+
+
+def _cache_generation(patient_id: str) -> int:
+    with _cache_lock:
+        return _cache_generations.get(patient_id, 0)
+
+
+def _cache_put(key: Tuple[str, str, str], value: Any, generation: int) -> None:
+    """Cache `value` unless the patient was written since `generation` was taken."""
+    now = time.monotonic()
+    with _cache_lock:
+        if _cache_generations.get(key[1], 0) != generation:
+            return
+        # Re-insert at the end so dict order stays expiry order (every entry has the same TTL).
+        _cache.pop(key, None)
+        while _cache:
+            oldest = next(iter(_cache))
+            if len(_cache) < _CACHE_MAX_ENTRIES and _cache[oldest][0] >= now:
+                break
+            del _cache[oldest]
+        _cache[key] = (now + _CACHE_TTL_SEC, value)
+
+
+def _cache_invalidate(patient_id: str) -> None:
+    with _cache_lock:
+        _cache_generations[patient_id] = _cache_generations.get(patient_id, 0) + 1
+        for key in [k for k in _cache if k[1] == patient_id]:
+            del _cache[key]
+
+
 def _iso_now() -> str:
     return datetime.utcnow().isoformat() + "Z"
 
 
 def upsert_subject(request: ClinicalSubjectUpsertRequest) -> ClinicalSubject:
+    _cache_invalidate(request.patient_id)
     _ensure_dir(_SUBJECTS_DIR)
     key = _safe_key(request.patient_id)
     fp = _SUBJECTS_DIR / f"{key}.json"
     now = _iso_now()
+    created_at = now
     if fp.exists():
+        # Only created_at is needed; skip full model validation of the old subject.
         try:
-            existing = ClinicalSubject.model_validate(json.loads(fp.read_text(encoding="utf-8")))
-            created_at = existing.created_at
+            existing = orjson.loads(fp.read_bytes())
+            if isinstance(existing, dict) and isinstance(existing.get("created_at"), str):
+                created_at = existing["created_at"]
         except Exception:
-            created_at = now
-    else:
-        created_at = now
+            pass
 
     subject = ClinicalSubject(
         patient_id=request.patient_id,
@@ -68,43 +139,116 @@ def upsert_subject(request: ClinicalSubjectUpsertRequest) -> ClinicalSubject:
         created_at=created_at,
         updated_at=now,
     )
-    fp.write_text(subject.model_dump_json(ensure_ascii=False, indent=2), encoding="utf-8")
+    # Write-then-rename so concurrent readers never see a half-written file.
+    tmp = fp.with_name(f".{fp.name}.{uuid4().hex}.tmp")
+    tmp.write_text(subject.model_dump_json(ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, fp)
+    _cache_invalidate(request.patient_id)
     return subject
 
 
 def get_subject(patient_id: str) -> Optional[ClinicalSubject]:
-    key = _safe_key(patient_id)
-    fp = _SUBJECTS_DIR / f"{key}.json"
-    if not fp.exists():
+    cache_key = ("subject", patient_id, "")
+    raw = _cache_get(cache_key)
+    if raw is _MISS:
+        generation = _cache_generation(patient_id)
+        raw = _read_subject_json(patient_id)
+        _cache_put(cache_key, raw, generation)
+    if raw is None:
         return None
     try:
-        return ClinicalSubject.model_validate(json.loads(fp.read_text(encoding="utf-8")))
+        return ClinicalSubject.model_validate_json(raw)
     except Exception:
         return None
 
 
+def _read_subject_json(patient_id: str) -> Optional[bytes]:
+    key = _safe_key(patient_id)
+    fp = _SUBJECTS_DIR / f"{key}.json"
+    try:
+        return fp.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
 def list_subjects(limit: int = 100, offset: int = 0) -> List[ClinicalSubject]:
     if not _SUBJECTS_DIR.exists():
         return []
+    # Page on directory entries first so only the returned subjects are read and parsed.
+    with os.scandir(_SUBJECTS_DIR) as it:
+        names = sorted((e.name for e in it if e.name.endswith(".json") and e.is_file()), reverse=True)
     items: List[ClinicalSubject] = []
-    for fp in sorted(_SUBJECTS_DIR.glob("*.json"), reverse=True):
+    for name in names[offset : offset + limit]:
         try:
-            items.append(ClinicalSubject.model_validate(json.loads(fp.read_text(encoding="utf-8"))))
+            items.append(ClinicalSubject.model_validate_json((_SUBJECTS_DIR / name).read_bytes()))
         except Exception:
             continue
-    return items[offset : offset + limit]
+    return items
 
 
 def _patient_records_dir(patient_id: str) -> Path:
     return _RECORDS_DIR / _safe_key(patient_id)
 
 
-def create_record(request: ClinicalRecordCreateRequest) -> ClinicalRecord:
-    patient_dir = _patient_records_dir(request.patient_id)
-    _ensure_dir(patient_dir)
-    record_id = str(uuid4())
-    record = ClinicalRecord(
-        record_id=record_id,
+_INSERT_RECORD_SQL = """
+    INSERT OR REPLACE INTO clinical_records (record_id, patient_id, record_type, recorded_at, created_at, record_json)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def _record_key(record_id: str) -> bytes:
+    """SQLite key for a record id: the 16 raw UUID bytes (hex and dashed ids map to the same key)."""
+    try:
+        return UUID(record_id).bytes
+    except ValueError:
+        # Non-UUID ids from hand-written legacy files.
+        return record_id.encode("utf-8")
+
+
+def _record_row(record: ClinicalRecord) -> Tuple[bytes, str, str, str, str, str]:
+    return (
+        _record_key(record.record_id),
+        record.patient_id,
+        record.record_type.value,
+        record.recorded_at,
+        record.created_at,
+        record.model_dump_json(),
+    )
+
+
+def _index_record(conn: sqlite3.Connection, record: ClinicalRecord) -> None:
+    conn.execute(_INSERT_RECORD_SQL, _record_row(record))
+
+
+def _backfill_index(patient_id: str) -> None:
+    """Import record files written before records moved to SQLite (once per patient per process)."""
+    if patient_id in _indexed_patients:
+        return
+    patient_dir = _patient_records_dir(patient_id)
+    names: List[str] = []
+    if patient_dir.exists():
+        with os.scandir(patient_dir) as it:
+            names = [e.name for e in it if e.name.endswith(".json") and e.is_file()]
+    if names:
+        with db_conn(settings.app_db_path) as conn:
+            known = {
+                bytes(row["record_id"])
+                for row in conn.execute("SELECT record_id FROM clinical_records WHERE patient_id = ?", (patient_id,))
+            }
+            for name in names:
+                if _record_key(name[: -len(".json")]) in known:
+                    continue
+                try:
+                    rec = ClinicalRecord.model_validate_json((patient_dir / name).read_bytes())
+                except Exception:
+                    continue
+                _index_record(conn, rec)
+    _indexed_patients.add(patient_id)
+
+
+def _new_record(request: ClinicalRecordCreateRequest, created_at: str) -> ClinicalRecord:
+    return ClinicalRecord(
+        record_id=uuid4().hex,
         patient_id=request.patient_id,
         record_type=request.record_type,
         recorded_at=request.recorded_at,
@@ -112,36 +256,90 @@ def create_record(request: ClinicalRecordCreateRequest) -> ClinicalRecord:
         tags=request.tags,
         source=request.source,
         data=request.data,
-        created_at=_iso_now(),
+        created_at=created_at,
     )
-    fp = patient_dir / f"{record_id}.json"
-    fp.write_text(record.model_dump_json(ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def create_record(request: ClinicalRecordCreateRequest) -> ClinicalRecord:
+    record = _new_record(request, _iso_now())
+    _cache_invalidate(record.patient_id)
+    with db_conn(settings.app_db_path) as conn:
+        _index_record(conn, record)
+    _cache_invalidate(record.patient_id)
     return record
 
 
+def create_records(requests: List[ClinicalRecordCreateRequest]) -> List[ClinicalRecord]:
+    """Insert many records in one transaction (e.g. a CPET import)."""
+    created_at = _iso_now()
+    records = [_new_record(request, created_at) for request in requests]
+    patient_ids = {record.patient_id for record in records}
+    for patient_id in patient_ids:
+        _cache_invalidate(patient_id)
+    with db_conn(settings.app_db_path) as conn:
+        conn.executemany(_INSERT_RECORD_SQL, [_record_row(record) for record in records])
+    for patient_id in patient_ids:
+        _cache_invalidate(patient_id)
+    return records
+
+
 def get_record(patient_id: str, record_id: str) -> Optional[ClinicalRecord]:
-    fp = _patient_records_dir(patient_id) / f"{record_id}.json"
-    if not fp.exists():
+    _backfill_index(patient_id)
+    with db_conn(settings.app_db_path) as conn:
+        row = conn.execute(
+            "SELECT record_json FROM clinical_records WHERE record_id = ? AND patient_id = ?",
+            (_record_key(record_id), patient_id),
+        ).fetchone()
+    if not row:
         return None
     try:
-        return ClinicalRecord.model_validate(json.loads(fp.read_text(encoding="utf-8")))
+        return ClinicalRecord.model_validate_json(row["record_json"])
     except Exception:
         return None
 
 
 def delete_record(patient_id: str, record_id: str) -> bool:
+    _cache_invalidate(patient_id)
+    _backfill_index(patient_id)
+    with db_conn(settings.app_db_path) as conn:
+        cur = conn.execute(
+            "DELETE FROM clinical_records WHERE record_id = ? AND patient_id = ?",
+            (_record_key(record_id), patient_id),
+        )
+        deleted = cur.rowcount > 0
+    # Remove the legacy file too, otherwise the next import would resurrect the record.
     fp = _patient_records_dir(patient_id) / f"{record_id}.json"
-    if not fp.exists():
-        return False
     try:
-        fp.unlink()
-        return True
+        fp.unlink(missing_ok=True)
     except Exception:
-        return False
+        pass
+    _cache_invalidate(patient_id)
+    return deleted
 
 
-def _date_prefix(iso8601: str) -> str:
-    return (iso8601 or "")[:10]
+def _list_records_query(
+    patient_id: str,
+    record_type: ClinicalRecordType | None,
+    start: Optional[str],
+    end: Optional[str],
+    limit: int,
+    offset: int,
+) -> Tuple[str, Tuple[Any, ...]]:
+    start_date = start or "0000-01-01"
+    # recorded_at[:10] <= end  <=>  recorded_at <= end + U+FFFF (binary collation), which keeps
+    # both bounds a plain range on the indexed column.
+    end_bound = (end or "9999-12-31") + "\uffff"
+
+    sql = "SELECT record_json FROM clinical_records WHERE patient_id = ?"
+    params: list = [patient_id]
+    if record_type:
+        sql += " AND record_type = ?"
+        params.append(record_type.value)
+    sql += " AND recorded_at BETWEEN ? AND ?"
+    params.extend([start_date, end_bound])
+    sql += " ORDER BY recorded_at DESC, created_at DESC LIMIT ? OFFSET ?"
+    params.extend([int(limit), int(offset)])
+    return sql, tuple(params)
 
 
 def list_records(
@@ -153,30 +351,68 @@ def list_records(
     limit: int = 100,
     offset: int = 0,
 ) -> List[ClinicalRecord]:
-    patient_dir = _patient_records_dir(patient_id)
-    if not patient_dir.exists():
-        return []
-
-    start_date = start or "0000-01-01"
-    end_date = end or "9999-12-31"
+    _backfill_index(patient_id)
+    sql, params = _list_records_query(patient_id, record_type, start, end, limit, offset)
+    with db_conn(settings.app_db_path) as conn:
+        rows = conn.execute(sql, params).fetchall()
 
     records: List[ClinicalRecord] = []
-    for fp in sorted(patient_dir.glob("*.json"), reverse=True):
+    for row in rows:
         try:
-            rec = ClinicalRecord.model_validate(json.loads(fp.read_text(encoding="utf-8")))
+            records.append(ClinicalRecord.model_validate_json(row["record_json"]))
         except Exception:
             continue
-        if record_type and rec.record_type != record_type:
-            continue
-        d = _date_prefix(rec.recorded_at)
-        if not (start_date <= d <= end_date):
-            continue
-        records.append(rec)
+    return records
+
 
-    return records[offset : offset + limit]
+def iter_records_json(
+    patient_id: str,
+    *,
+    record_type: ClinicalRecordType | None = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    batch_size: int = 64,
+) -> Iterator[List[str]]:
+    """Same page as `list_records`, as batches of stored record JSON (no model round-trip).
+
+    The legacy import, the query and the first fetch run before this returns, so a locked DB or
+    a failing import raises here rather than partway through a streamed response.
+    """
+    _backfill_index(patient_id)
+    sql, params = _list_records_query(patient_id, record_type, start, end, limit, offset)
+    with ExitStack() as stack:
+        conn = stack.enter_context(db_conn(settings.app_db_path))
+        cur = conn.execute(sql, params)
+        rows = cur.fetchmany(batch_size)
+        # Success: the connection now belongs to the batch iterator, which closes it when done.
+        stack = stack.pop_all()
+
+    def batches() -> Iterator[List[str]]:
+        nonlocal rows
+        with stack:
+            while rows:
+                yield [row["record_json"] for row in rows]
+                rows = cur.fetchmany(batch_size)
+
+    return batches()
 
 
 def latest_record(patient_id: str, record_type: ClinicalRecordType) -> Optional[ClinicalRecord]:
-    items = list_records(patient_id, record_type=record_type, limit=1, offset=0)
-    return items[0] if items else None
-
+    cache_key = ("latest_record", patient_id, record_type.value)
+    raw = _cache_get(cache_key)
+    if raw is _MISS:
+        generation = _cache_generation(patient_id)
+        _backfill_index(patient_id)
+        sql, params = _list_records_query(patient_id, record_type, None, None, 1, 0)
+        with db_conn(settings.app_db_path) as conn:
+            row = conn.execute(sql, params).fetchone()
+        raw = row["record_json"] if row else None
+        _cache_put(cache_key, raw, generation)
+    if raw is None:
+        return None
+    try:
+        return ClinicalRecord.model_validate_json(raw)
+    except Exception:
+        return None
@@ -1,102 +1,138 @@
 from __future__ import annotations
 
 import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, List, Optional, Tuple
 
 
+_BACKEND_DIR = Path(__file__).resolve().parent
+_REPO_ROOT = _BACKEND_DIR.parent
+
+
+def _path(value: Any) -> Path:
+    return Path(value).expanduser()
+
+
+# (attribute, env var, converter, default) for settings read as `env.get(var, default)`.
+# Settings with derived defaults or "empty means unset" semantics are handled in Settings._load().
+_ENV_FIELDS: Tuple[Tuple[str, str, Callable[[Any], Any], Optional[Any]], ...] = (
+    (
+        "data_file",
+        "CPET_DATA_FILE",
+        _path,
+        "/home/cheng/workspace/cpetx_workspace/cpet_former/artifacts/dataset/processed/processed_institutes.h5",
+    ),
+    ("db_path", "CPET_WEB_DB", _path, _BACKEND_DIR / "annotations.db"),
+    (
+        "pace_former_config",
+        "CPET_PACE_CONFIG",
+        _path,
+        "/home/cheng/workspace/cpetx_workspace/cpet_former/configs/model/v4/pace_former_experiment/9.yaml",
+    ),
+    (
+        "pace_former_checkpoint",
+        "CPET_PACE_CHECKPOINT",
+        _path,
+        "/home/cheng/workspace/cpetx_workspace/cpet_former/pace/v4/internal/variants/models/9/train/artifacts/best_model.pth",
+    ),
+    ("pace_former_device", "CPET_PACE_DEVICE", str, "cpu"),
+    ("pace_former_eval_mode", "CPET_PACE_EVAL_MODE", str, "online"),
+    ("pace_former_norm", "CPET_PACE_NORM", str, "per_exam"),
+    ("pace_former_norm_min_points", "CPET_PACE_NORM_MIN_POINTS", int, "12"),
+    ("pace_former_min_points", "CPET_PACE_MIN_POINTS", int, "8"),
+    ("sim_default_speed", "CPET_SIM_SPEED", float, "1.0"),
+    ("sim_default_smooth", "CPET_SIM_SMOOTH", str, "none"),
+    ("delta_sec", "CPET_DELTA_SEC", float, "15"),
+    ("agent_config_path", "CPET_AGENT_CONFIG", _path, _REPO_ROOT / "opencode.json"),
+    ("qwen_api_key", "QWEN_API_KEY", str, None),
+    ("qwen_base_url", "QWEN_BASE_URL", str, "https://dashscope.aliyuncs.com/compatible-mode/v1"),
+    ("qwen_model", "QWEN_MODEL", str, "qwen-plus"),
+    ("qwen_timeout", "QWEN_TIMEOUT", float, "30"),
+    ("qwen_max_tokens", "QWEN_MAX_TOKENS", int, "512"),
+    ("qwen_temperature", "QWEN_TEMPERATURE", float, "0.2"),
+    ("opencode_base_url", "OPENCODE_BASE_URL", str, "http://127.0.0.1:4096"),
+    ("opencode_directory", "OPENCODE_DIRECTORY", _path, _REPO_ROOT),
+)
+
+
+@dataclass(slots=True, frozen=True)
 class Settings:
-    """Centralized configuration for the web annotation backend."""
-
-    def __init__(self) -> None:
-        base_dir = Path(__file__).resolve().parent
-        repo_root = base_dir.parent
-        data_root_default = repo_root / "data"
-        default_data = Path(
-            "/home/cheng/workspace/cpetx_workspace/cpet_former/artifacts/dataset/processed/processed_institutes.h5"
-        )
-        default_model_config = Path(
-            "/home/cheng/workspace/cpetx_workspace/cpet_former/configs/model/v4/pace_former_experiment/9.yaml"
-        )
-        default_model_checkpoint = Path(
-            "/home/cheng/workspace/cpetx_workspace/cpet_former/pace/v4/internal/variants/models/9/train/artifacts/best_model.pth"
-        )
-        self.data_file: Path = Path(
-            os.environ.get("CPET_DATA_FILE", default_data)
-        ).expanduser()
-        self.db_path: Path = Path(
-            os.environ.get("CPET_WEB_DB", base_dir / "annotations.db")
-        ).expanduser()
-        self.pace_former_config: Path = Path(
-            os.environ.get("CPET_PACE_CONFIG", default_model_config)
-        ).expanduser()
-        self.pace_former_checkpoint: Path = Path(
-            os.environ.get("CPET_PACE_CHECKPOINT", default_model_checkpoint)
-        ).expanduser()
-        self.pace_former_device: str = os.environ.get(
-            "CPET_PACE_DEVICE", "cpu"
-        )
-        self.pace_former_eval_mode: str = os.environ.get(
-            "CPET_PACE_EVAL_MODE", "online"
-        )
-        self.pace_former_norm: str = os.environ.get(
-            "CPET_PACE_NORM", "per_exam"
-        )
-        self.pace_former_norm_min_points: int = int(
-            os.environ.get("CPET_PACE_NORM_MIN_POINTS", "12")
-        )
-        self.pace_former_min_points: int = int(
-            os.environ.get("CPET_PACE_MIN_POINTS", "8")
-        )
-        self.sim_default_speed: float = float(
-            os.environ.get("CPET_SIM_SPEED", "1.0")
-        )
-        self.sim_default_smooth: str = os.environ.get(
-            "CPET_SIM_SMOOTH", "none"
-        )
-        self.delta_sec: float = float(os.environ.get("CPET_DELTA_SEC", "15"))
-        self.agent_config_path: Path = Path(
-            os.environ.get("CPET_AGENT_CONFIG", base_dir.parent / "opencode.json")
-        ).expanduser()
-        self.qwen_api_key: str | None = os.environ.get("QWEN_API_KEY")
-        self.qwen_base_url: str = os.environ.get(
-            "QWEN_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"
-        )
-        self.qwen_model: str = os.environ.get("QWEN_MODEL", "qwen-plus")
-        self.qwen_timeout: float = float(os.environ.get("QWEN_TIMEOUT", "30"))
-        self.qwen_max_tokens: int = int(os.environ.get("QWEN_MAX_TOKENS", "512"))
-        self.qwen_temperature: float = float(os.environ.get("QWEN_TEMPERATURE", "0.2"))
-        self.opencode_base_url: str = os.environ.get(
-            "OPENCODE_BASE_URL", "http://127.0.0.1:4096"
-        )
-        self.opencode_directory: Path = Path(
-            os.environ.get("OPENCODE_DIRECTORY", base_dir.parent)
-        ).expanduser()
-
-        # ---- Xinhui app (auth/chat/artifacts) ----
-        self.data_root: Path = Path(
-            os.environ.get("XINHUI_DATA_ROOT") or data_root_default
-        ).expanduser()
-        self.app_db_path: Path = Path(
-            os.environ.get("XINHUI_DB_PATH") or (self.data_root / "xinhui.db")
-        ).expanduser()
+    """Centralized configuration for the web annotation backend.
+
+    Immutable: values are read from the environment once, by ``_load()``, at import time.
+    """
+
+    data_file: Path
+    db_path: Path
+    pace_former_config: Path
+    pace_former_checkpoint: Path
+    pace_former_device: str
+    pace_former_eval_mode: str
+    pace_former_norm: str
+    pace_former_norm_min_points: int
+    pace_former_min_points: int
+    sim_default_speed: float
+    sim_default_smooth: str
+    delta_sec: float
+    agent_config_path: Path
+    qwen_api_key: str | None
+    qwen_base_url: str
+    qwen_model: str
+    qwen_timeout: float
+    qwen_max_tokens: int
+    qwen_temperature: float
+    opencode_base_url: str
+    opencode_directory: Path
+
+    # ---- Xinhui app (auth/chat/artifacts) ----
+    data_root: Path
+    app_db_path: Path
+    jwt_secret: str
+    api_key_secret: str
+    token_ttl_days: int
+    cookie_secure: bool
+    max_upload_mb: int
+    mcp_token: str
+    cors_origins: List[str]
+
+    # ---- Diet vision ----
+    diet_vision_pybase64: bool
+
+    @classmethod
+    def _load(cls) -> Settings:
+        env = os.environ
+        values: dict[str, Any] = {}
+        for attr, var, convert, default in _ENV_FIELDS:
+            raw = env.get(var, default)
+            values[attr] = convert(raw) if raw is not None else None
+
+        data_root = _path(env.get("XINHUI_DATA_ROOT") or _REPO_ROOT / "data")
         # In production you MUST set XINHUI_JWT_SECRET. We fall back to a dev secret to keep local
         # demos easy, but this is not safe for public deployments.
-        self.jwt_secret: str = os.environ.get("XINHUI_JWT_SECRET") or "dev-secret-change-me"
-        # API key hashing secret (defaults to JWT secret if not provided).
-        self.api_key_secret: str = os.environ.get("XINHUI_API_KEY_SECRET") or self.jwt_secret
-        self.token_ttl_days: int = int(os.environ.get("XINHUI_TOKEN_TTL_DAYS") or "7")
-        self.cookie_secure: bool = (os.environ.get("XINHUI_COOKIE_SECURE") or "").strip() in {"1", "true", "True"}
-        self.max_upload_mb: int = int(os.environ.get("XINHUI_MAX_UPLOAD_MB") or "20")
-        self.mcp_token: str = os.environ.get("XINHUI_MCP_TOKEN") or ""
-
-        cors = os.environ.get("CPET_CORS_ORIGINS", "*")
+        jwt_secret = env.get("XINHUI_JWT_SECRET") or "dev-secret-change-me"
+
+        cors = env.get("CPET_CORS_ORIGINS", "*")
         if cors.strip() == "*":
-            self.cors_origins: List[str] = ["*"]
+            cors_origins = ["*"]
         else:
-            self.cors_origins = [
-                origin.strip() for origin in cors.split(",") if origin.strip()
-            ]
+            cors_origins = [origin.strip() for origin in cors.split(",") if origin.strip()]
+
+        return cls(
+            **values,
+            data_root=data_root,
+            app_db_path=_path(env.get("XINHUI_DB_PATH") or (data_root / "xinhui.db")),
+            jwt_secret=jwt_secret,
+            # API key hashing secret (defaults to JWT secret if not provided).
+            api_key_secret=env.get("XINHUI_API_KEY_SECRET") or jwt_secret,
+            token_ttl_days=int(env.get("XINHUI_TOKEN_TTL_DAYS") or "7"),
+            cookie_secure=(env.get("XINHUI_COOKIE_SECURE") or "").strip() in {"1", "true", "True"},
+            max_upload_mb=int(env.get("XINHUI_MAX_UPLOAD_MB") or "20"),
+            mcp_token=env.get("XINHUI_MCP_TOKEN") or "",
+            cors_origins=cors_origins,
+            # Use pybase64's SIMD encoder for vision uploads when installed; set to 0 to pin stdlib base64.
+            diet_vision_pybase64=(env.get("DIET_VISION_PYBASE64") or "1").strip() not in {"0", "false", "False"},
+        )
 
 
-settings = Settings()
+settings = Settings._load()
@@ -1,17 +1,46 @@
 from __future__ import annotations
 
 import sqlite3
-from datetime import datetime
+import time
 from typing import Dict, Optional, Tuple
 
+# Latest annotation per role, picked inside SQLite instead of shipping every row to Python.
+# sqlite3 caches prepared statements per connection keyed by SQL text, so keeping these as
+# module constants lets repeated calls reuse the compiled statements.
+_LATEST_BY_ROLE_SQL = """
+    SELECT role, at_time FROM (
+        SELECT role, at_time,
+               ROW_NUMBER() OVER (PARTITION BY role ORDER BY created_at DESC, id DESC) AS rn
+        FROM annotations
+        WHERE exam_id = ?
+    )
+    WHERE rn = 1
+"""
+
+_UPSERT_CONSENSUS_SQL = """
+    INSERT INTO consensus (exam_id, delta, status, t_a, t_b, t_c, t_gt, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(exam_id) DO UPDATE SET
+        delta=excluded.delta,
+        status=excluded.status,
+        t_a=excluded.t_a,
+        t_b=excluded.t_b,
+        t_c=excluded.t_c,
+        t_gt=excluded.t_gt,
+        updated_at=excluded.updated_at
+"""
+
+# (epoch second, formatted) for iso_now_seconds(); annotation bursts land in the same second.
+_last_iso: Tuple[int, str] = (0, "")
 
-def _latest_by_role(rows: list[Tuple[str, float, str]]) -> Dict[str, Tuple[float, str]]:
-    """Return the latest annotation per role."""
-    latest: Dict[str, Tuple[float, str]] = {}
-    for role, at_time, created_at in rows:
-        if role not in latest or created_at > latest[role][1]:
-            latest[role] = (at_time, created_at)
-    return latest
+
+def iso_now_seconds() -> str:
+    """UTC now as ``YYYY-MM-DDTHH:MM:SS``, formatted at most once per wall-clock second."""
+    global _last_iso
+    t = int(time.time())
+    if _last_iso[0] != t:
+        _last_iso = (t, time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t)))
+    return _last_iso[1]
 
 
 def recompute_consensus(
@@ -25,16 +54,10 @@ def recompute_consensus(
     - If both exist and diff > delta => discordant (await adjudication).
     - If adjudicator present => finalized, t_gt = t_c.
     """
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT role, at_time, created_at FROM annotations WHERE exam_id=?",
-        (exam_id,),
-    )
-    rows = cur.fetchall()
-    latest = _latest_by_role(rows)
-    t_a = latest.get("a", (None, None))[0]
-    t_b = latest.get("b", (None, None))[0]
-    t_c = latest.get("adjudicator", (None, None))[0]
+    latest: Dict[str, float] = dict(conn.execute(_LATEST_BY_ROLE_SQL, (exam_id,)).fetchall())
+    t_a = latest.get("a")
+    t_b = latest.get("b")
+    t_c = latest.get("adjudicator")
 
     status = "pending"
     t_gt: Optional[float] = None
@@ -52,19 +75,8 @@ def recompute_consensus(
     elif t_a is not None or t_b is not None:
         status = "partial"
 
-    cur.execute(
-        """
-        INSERT INTO consensus (exam_id, delta, status, t_a, t_b, t_c, t_gt, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(exam_id) DO UPDATE SET
-            delta=excluded.delta,
-            status=excluded.status,
-            t_a=excluded.t_a,
-            t_b=excluded.t_b,
-            t_c=excluded.t_c,
-            t_gt=excluded.t_gt,
-            updated_at=excluded.updated_at
-        """,
+    conn.execute(
+        _UPSERT_CONSENSUS_SQL,
         (
             exam_id,
             float(delta_sec),
@@ -73,7 +85,7 @@ def recompute_consensus(
             t_b,
             t_c,
             t_gt,
-            datetime.utcnow().isoformat(timespec="seconds"),
+            iso_now_seconds(),
         ),
     )
     return {
@@ -1,17 +1,168 @@
 from __future__ import annotations
 
+import io
+import itertools
+import os
 import pickle
+import threading
+from collections import Counter, OrderedDict
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import h5py
 import numpy as np
+import orjson
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc  # noqa: F401  (pa.ipc)
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    feather = None
+
+try:
+    # Registers the Bitshuffle/LZ4 HDF5 filter so compressed datasets decode transparently.
+    import hdf5plugin
+except ImportError:  # pragma: no cover - optional dependency
+    hdf5plugin = None
+
 from .smoothing import apply_smoothing
 
 
+# Signal columns kept as float32 in the institute cache: half the memory traffic per request
+# and plenty of precision for plotting.
+_FLOAT32_COLUMNS = ("Time", "VO2", "VCO2", "VE", "HR", "VT", "RER", "PetO2", "PetCO2", "VE_VO2", "VE_VCO2")
+
+# Raw chunk cache for the shared read handle: big enough that an institute's hot chunks stay
+# resident across requests. rdcc_nslots is a prime well above the number of cached chunks.
+_RDCC_NBYTES = 256 * 1024 * 1024
+_RDCC_NSLOTS = 100_003
+
+# Timeseries panels in payload order: view name -> (payload key, source column) pairs; every
+# panel also carries ``time_sec``. ``vslope`` is a legacy alias of panel5.
+_PANELS: Tuple[Tuple[str, Tuple[Tuple[str, str], ...]], ...] = (
+    ("panel1", (("ve", "VE"),)),  # VE vs Time
+    ("panel2", (("hr", "HR"),)),  # HR vs Time
+    ("panel3", (("vo2", "VO2"),)),  # VO2 vs Time
+    ("panel4", (("vo2", "VO2"), ("vco2", "VCO2"))),  # VO2 vs VCO2 (second V-Slope / RCP view)
+    ("panel5", (("vo2", "VO2"), ("vco2", "VCO2"))),  # Primary V-Slope
+    ("panel6", (("ve_vo2", "VE_VO2"), ("ve_vco2", "VE_VCO2"))),
+    ("panel9", (("peto2", "PetO2"), ("petco2", "PetCO2"))),
+    ("panel7", (("ve", "VE"), ("vt", "VT"))),  # VT vs VE (breathing pattern)
+    ("panel8", (("rer", "RER"),)),  # RER vs Time
+)
+
+_TABLE_COLUMNS = (
+    "Time",
+    "Load_Phase",
+    "Power_Load",
+    "VO2",
+    "VCO2",
+    "RER",
+    "VE_VO2",
+    "VE_VCO2",
+    "PetO2",
+    "PetCO2",
+    "HR",
+    "VE",
+)
+
+# Datasets written by CPETStudyData.export_chunked_features (replaced on every run).
+_CHUNKED_KEYS = (
+    "features_f32",
+    "features_exact",
+    "features_text",
+    "exam_offsets",
+    "exam_offset_ids",
+)
+
+# Budget for cached smoothed exam columns (see CPETStudyData._exam_columns).
+_EXAM_COLUMNS_CACHE_BYTES = 128 * 1024 * 1024
+
+# int16 sentinel for missing (NaN/inf) samples in precision="i16" payloads.
+I16_MISSING = -32768
+
+
+def _matrix_compression() -> Dict[str, Any]:
+    """Filter kwargs for ``features_f32``: Bitshuffle+LZ4 when hdf5plugin is installed, else shuffle+LZF."""
+    if hdf5plugin is not None:
+        return dict(hdf5plugin.Bitshuffle(cname="lz4"))
+    return {"compression": "lzf", "shuffle": True}
+
+
+def _quantize_i16(values: Any) -> Any:
+    """``{"scale", "values"}`` with ``values * scale`` ~= the original float samples."""
+    if not isinstance(values, np.ndarray) or values.dtype.kind != "f":
+        return values
+    finite = np.isfinite(values)
+    peak = float(np.abs(values[finite]).max()) if finite.any() else 0.0
+    scale = peak / 32767 if peak > 0 else 1.0
+    quantized = np.full(values.shape, I16_MISSING, dtype=np.int16)
+    quantized[finite] = np.round(values[finite] / scale).astype(np.int16)
+    return {"scale": scale, "values": quantized}
+
+
+def _read_pickled(ds: h5py.Dataset) -> Any:
+    # read_direct fills one preallocated buffer and pickle reads it in place: no ds[()] temporary
+    # followed by a tobytes() copy.
+    raw = np.empty(ds.shape, dtype=ds.dtype)
+    ds.read_direct(raw)
+    return pickle.loads(memoryview(raw))
+
+
+def _column_values(values: np.ndarray) -> Any:
+    """Numeric columns stay ndarrays (orjson encodes them straight from the buffer); others become lists."""
+    if values.dtype.kind in "fiub":
+        return values
+    return values.tolist()
+
+
+def _is_exact_dtype(dtype: Any) -> bool:
+    """NumPy int/uint/bool columns, which the chunked layout stores outside the float32 matrix."""
+    return isinstance(dtype, np.dtype) and dtype.kind in "iub"
+
+
+def _max_time(values: np.ndarray) -> float:
+    """``max`` skipping NaN samples, like ``Series.max()``."""
+    finite = values[~np.isnan(values)] if values.dtype.kind == "f" else values
+    return float(finite.max()) if len(finite) else float("nan")
+
+
+class _ExamColumnsCache:
+    """LRU of per-exam column arrays, bounded by total array bytes rather than entry count."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[Dict[str, np.ndarray], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Dict[str, np.ndarray]]:
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            self._entries.move_to_end(key)
+            return hit[0]
+
+    def put(self, key: Tuple[Any, ...], columns: Dict[str, np.ndarray]) -> None:
+        size = sum(arr.nbytes for arr in columns.values())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (columns, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+
 class CPETStudyData:
     """HDF5-backed CPET exam loader with lightweight caching."""
 
@@ -19,34 +170,100 @@ class CPETStudyData:
         self.data_file = Path(data_file).expanduser()
         if not self.data_file.exists():
             raise FileNotFoundError(f"CPET data file not found: {self.data_file}")
-        self.exam_to_institute = self._build_exam_index()
+        self._h5: Optional[h5py.File] = None
+        self._h5_datasets: Dict[str, h5py.Dataset] = {}
+        self._h5_lock = threading.Lock()
+        self._columns_cache = _ExamColumnsCache(_EXAM_COLUMNS_CACHE_BYTES)
+        self.exam_to_institute = self._load_exam_index()
+
+    def _h5_file(self) -> h5py.File:
+        """Read-only handle shared by all loaders (and threads) for the life of the process."""
+        h5 = self._h5
+        if h5 is None:
+            with self._h5_lock:
+                if self._h5 is None:
+                    self._h5 = h5py.File(
+                        self.data_file, "r", rdcc_nbytes=_RDCC_NBYTES, rdcc_nslots=_RDCC_NSLOTS
+                    )
+                h5 = self._h5
+        return h5
+
+    def _h5_dataset(self, path: str) -> h5py.Dataset:
+        # The raw chunk cache belongs to the open dataset, so hot datasets stay open too.
+        ds = self._h5_datasets.get(path)
+        if ds is None:
+            ds = self._h5_datasets.setdefault(path, self._h5_file()[path])
+        return ds
+
+    def close(self) -> None:
+        with self._h5_lock:
+            self._h5_datasets.clear()
+            if self._h5 is not None:
+                self._h5.close()
+                self._h5 = None
+
+    def _load_exam_index(self) -> Dict[str, str]:
+        """Exam index from the sidecar cache, rebuilt only when the HDF5 file changes."""
+        cache_path = self.data_file.with_name(self.data_file.name + ".examidx.pkl")
+        stat = self.data_file.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        try:
+            with cache_path.open("rb") as fh:
+                cached_key, mapping = pickle.load(fh)
+            if cached_key == key and isinstance(mapping, dict):
+                return mapping
+        except Exception:
+            pass
+
+        mapping = self._build_exam_index()
+        tmp = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            with tmp.open("wb") as fh:
+                pickle.dump((key, mapping), fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+        except OSError:
+            # Read-only data directory: just rebuild on every start as before.
+            tmp.unlink(missing_ok=True)
+        return mapping
 
     def _build_exam_index(self) -> Dict[str, str]:
         mapping: Dict[str, str] = {}
-        with h5py.File(self.data_file, "r") as h5:
-            institutes = h5.get("institutes")
-            if institutes is None:
-                return mapping
-            for inst_name, inst_group in institutes.items():
-                exam_ids_ds = inst_group.get("exam_ids")
-                if exam_ids_ds is None:
-                    continue
-                raw = exam_ids_ds[()]
-                if isinstance(raw, (bytes, str)):
-                    ids = [raw.decode("utf-8")
-                           if isinstance(raw, bytes) else str(raw)]
+        h5 = self._h5_file()
+        institutes = h5.get("institutes")
+        if institutes is None:
+            return mapping
+        for inst_name, inst_group in institutes.items():
+            exam_ids_ds = inst_group.get("exam_ids")
+            if exam_ids_ds is None:
+                continue
+            raw = exam_ids_ds[()]
+            if isinstance(raw, (bytes, str)):
+                ids = [raw.decode("utf-8")
+                       if isinstance(raw, bytes) else str(raw)]
+            else:
+                arr = np.asarray(raw)
+                if arr.dtype.kind == "S":
+                    ids = np.char.decode(arr, "utf-8").tolist()
                 else:
                     ids = []
-                    for item in raw:
+                    for item in arr.tolist():
                         if isinstance(item, (bytes, np.bytes_)):
                             ids.append(item.decode("utf-8"))
                         else:
                             ids.append(str(item))
-                for eid in ids:
-                    if eid:
-                        mapping[eid] = inst_name
+            mapping.update((eid, inst_name) for eid in ids if eid)
         return mapping
 
+    def busiest_institutes(self, limit: int = 2) -> List[str]:
+        """Institutes with the most exams; preload targets (bounded by the institute caches)."""
+        return [inst for inst, _ in Counter(self.exam_to_institute.values()).most_common(limit)]
+
+    def warm_institute(self, institute: str) -> None:
+        """Populate the per-institute caches so the first request for it is a cache hit."""
+        if self._chunked_layout(institute) is None:
+            self._load_institute_features(institute)
+        self._load_institute_metadata(institute)
+
     def list_exams(self, limit: int = 50, institute: Optional[str] = None) -> List[Dict[str, str]]:
         entries: List[Dict[str, str]] = []
         for idx, (exam_id, inst) in enumerate(self.exam_to_institute.items()):
@@ -57,34 +274,183 @@ class CPETStudyData:
                 break
         return entries
 
+    @property
+    def arrow_dir(self) -> Path:
+        """Columnar copies of the pickled tables: ``<data_file>.arrow/<institute>/<dataset>.arrow``."""
+        return self.data_file.with_name(self.data_file.name + ".arrow")
+
+    def _read_arrow_table(self, institute: str, dataset: str) -> Optional[pd.DataFrame]:
+        # Memory-mapped Arrow IPC (Feather v2): numeric columns come back without the
+        # tobytes() copy and pickle reconstruction of the HDF5 path.
+        if pa is None:
+            return None
+        path = self.arrow_dir / institute / f"{dataset}.arrow"
+        if not path.exists():
+            return None
+        with pa.memory_map(str(path), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas(split_blocks=True)
+
+    def export_arrow_tables(self) -> List[Path]:
+        """One-time migration: write every institute's pickled features/metadata as Arrow files."""
+        if feather is None:
+            raise RuntimeError("pyarrow is required to export Arrow tables")
+        written: List[Path] = []
+        h5 = self._h5_file()
+        institutes = h5.get("institutes")
+        if institutes is None:
+            return written
+        for inst_name, inst_group in institutes.items():
+            for dataset in ("features", "metadata"):
+                ds = inst_group.get(dataset)
+                if ds is None:
+                    continue
+                df = _read_pickled(ds)
+                path = self.arrow_dir / inst_name / f"{dataset}.arrow"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Uncompressed so reads can be served straight from the memory map.
+                feather.write_feather(df.reset_index(drop=True), str(path), compression="uncompressed")
+                written.append(path)
+        return written
+
+    def export_chunked_features(self) -> List[str]:
+        """One-time migration: store each institute's features as a chunked float32 matrix.
+
+        Writes ``features_f32`` for float columns (rows grouped by exam, chunked around the
+        median exam length and capped near 1 MB, compressed per ``_matrix_compression``),
+        ``features_exact/<col>`` for int/bool columns at their own dtype, ``features_text/<col>``
+        for string columns and ``exam_offsets`` / ``exam_offset_ids`` so one exam is a single
+        row-range read. Returns the institute names.
+        """
+        h5 = self._h5_file()
+        institutes = h5.get("institutes")
+        names = [name for name, group in institutes.items() if "features" in group] if institutes else []
+
+        # Decode everything, then drop the shared read handle before reopening for writing.
+        frames = {name: self._load_institute_features(name) for name in names}
+        self.close()
+        with h5py.File(self.data_file, "a") as h5:
+            for name, (df, offsets) in frames.items():
+                group = h5["institutes"][name]
+                for key in _CHUNKED_KEYS:
+                    if key in group:
+                        del group[key]
+                columns = [c for c in df.columns if c != "Examination_ID"]
+                # Ints and bools keep their dtype: float32 would turn True into 1.0 and round
+                # anything past 2**24.
+                exact = [c for c in columns if _is_exact_dtype(df[c].dtype)]
+                numeric = [c for c in columns if c not in exact and df[c].dtype.kind in "fiub"]
+                text = [c for c in columns if c not in numeric and c not in exact]
+                n_rows = len(df)
+                if not n_rows or not numeric:
+                    continue
+
+                lengths = [end - start for start, end in offsets.values()]
+                chunk_rows = int(np.median(lengths)) if lengths else n_rows
+                chunk_rows = max(1, min(chunk_rows, n_rows, (1 << 20) // (4 * len(numeric))))
+                matrix = group.create_dataset(
+                    "features_f32",
+                    data=df[numeric].to_numpy(dtype=np.float32),
+                    chunks=(chunk_rows, len(numeric)),
+                    **_matrix_compression(),
+                )
+                matrix.attrs["columns"] = numeric
+                matrix.attrs["column_order"] = list(df.columns)
+                exact_group = group.create_group("features_exact")
+                for col in exact:
+                    exact_group.create_dataset(col, data=df[col].to_numpy(), chunks=(chunk_rows,))
+                text_group = group.create_group("features_text")
+                for col in text:
+                    values = df[col].astype(object).where(df[col].notna(), "").astype(str)
+                    text_group.create_dataset(
+                        col, data=values.to_numpy(), dtype=h5py.string_dtype(), chunks=(chunk_rows,)
+                    )
+                group.create_dataset("exam_offset_ids", data=list(offsets), dtype=h5py.string_dtype())
+                group.create_dataset("exam_offsets", data=np.array(list(offsets.values()), dtype=np.int64))
+        return names
+
+    @lru_cache(maxsize=8)
+    def _chunked_layout(
+        self, institute: str
+    ) -> Optional[Tuple[Dict[str, Tuple[int, int]], List[str], List[str], List[str], List[str]]]:
+        """(exam offsets, float, int/bool, text columns, column order) if the institute was migrated."""
+        h5 = self._h5_file()
+        group = h5["institutes"].get(institute)
+        if group is None or "features_f32" not in group:
+            return None
+        matrix = group["features_f32"]
+        numeric = [str(c) for c in matrix.attrs["columns"]]
+        order = [str(c) for c in matrix.attrs["column_order"]]
+        # Institutes migrated before features_exact existed have no int/bool group.
+        exact = list(group["features_exact"].keys()) if "features_exact" in group else []
+        text = list(group["features_text"].keys()) if "features_text" in group else []
+        ids = group["exam_offset_ids"].asstr()[()].tolist()
+        spans = group["exam_offsets"][()].tolist()
+        offsets = {eid: (int(s), int(e)) for eid, (s, e) in zip(ids, spans)}
+        return offsets, numeric, exact, text, order
+
+    def _read_exam_rows(self, institute: str, exam_id: str) -> Optional[pd.DataFrame]:
+        layout = self._chunked_layout(institute)
+        if layout is None:
+            return None
+        offsets, numeric, exact, text, order = layout
+        row_start, row_end = offsets.get(exam_id, (0, 0))
+        # One hyperslab over the exam's rows; it touches only the chunks that hold them.
+        prefix = f"institutes/{institute}"
+        matrix = self._h5_dataset(f"{prefix}/features_f32")
+        block = np.empty((row_end - row_start, matrix.shape[1]), dtype=np.float32)
+        if len(block):
+            matrix.read_direct(block, np.s_[row_start:row_end, :])
+        frame = pd.DataFrame(block, columns=numeric, copy=False)
+        for col in exact:
+            frame[col] = self._h5_dataset(f"{prefix}/features_exact/{col}")[row_start:row_end]
+        for col in text:
+            values = self._h5_dataset(f"{prefix}/features_text/{col}").asstr()[row_start:row_end]
+            frame[col] = [v or None for v in values.tolist()]
+        frame["Examination_ID"] = exam_id
+        return frame[order]
+
     @lru_cache(maxsize=2)
-    def _load_institute_features(self, institute: str) -> pd.DataFrame:
-        with h5py.File(self.data_file, "r") as h5:
+    def _load_institute_features(self, institute: str) -> Tuple[pd.DataFrame, Dict[str, Tuple[int, int]]]:
+        """Institute features sorted by exam (then time), plus each exam's ``[start, end)`` row span."""
+        df = self._read_arrow_table(institute, "features")
+        if df is None:
+            h5 = self._h5_file()
             inst_group = h5["institutes"].get(institute)
             if inst_group is None:
                 raise KeyError(f"Institution not found: {institute}")
             features_ds = inst_group.get("features")
             if features_ds is None:
                 raise KeyError(f"Features dataset missing for institute {institute}")
-            raw = features_ds[()]
-        buffer = memoryview(raw).tobytes()
-        df = pickle.loads(buffer)
+            df = _read_pickled(features_ds)
         if not isinstance(df, pd.DataFrame):
             raise TypeError(f"Decoded features are not a DataFrame for {institute}")
-        return df
+
+        sort_cols = ["Examination_ID", "Time"] if "Time" in df.columns else ["Examination_ID"]
+        df = df.sort_values(sort_cols, kind="mergesort")
+        codes = df["Examination_ID"].to_numpy()
+        if len(codes) == 0:
+            return df, {}
+        starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+        ends = np.append(starts[1:], len(codes))
+        offsets = {eid: (int(s), int(e)) for eid, s, e in zip(codes[starts].tolist(), starts, ends)}
+        downcast = {c: np.float32 for c in _FLOAT32_COLUMNS if c in df.columns and df[c].dtype == np.float64}
+        if downcast:
+            df = df.astype(downcast)
+        return df, offsets
 
     @lru_cache(maxsize=2)
     def _load_institute_metadata(self, institute: str) -> pd.DataFrame:
-        with h5py.File(self.data_file, "r") as h5:
+        df = self._read_arrow_table(institute, "metadata")
+        if df is None:
+            h5 = self._h5_file()
             inst_group = h5["institutes"].get(institute)
             if inst_group is None:
                 raise KeyError(f"Institution not found: {institute}")
             metadata_ds = inst_group.get("metadata")
             if metadata_ds is None:
                 raise KeyError(f"Metadata dataset missing for institute {institute}")
-            raw = metadata_ds[()]
-        buffer = memoryview(raw).tobytes()
-        df = pickle.loads(buffer)
+            df = _read_pickled(metadata_ds)
         if not isinstance(df, pd.DataFrame):
             raise TypeError(f"Decoded metadata is not a DataFrame for {institute}")
         return df
@@ -100,10 +466,12 @@ class CPETStudyData:
         if exam_id not in self.exam_to_institute:
             raise KeyError(f"Exam {exam_id} not found in index.")
         institute = self.exam_to_institute[exam_id]
-        features = self._load_institute_features(institute)
-        exam_df = features[features["Examination_ID"] == exam_id].copy()
-        if "Time" in exam_df.columns:
-            exam_df = exam_df.sort_values("Time")
+        exam_df = self._read_exam_rows(institute, exam_id)
+        if exam_df is None:
+            features, offsets = self._load_institute_features(institute)
+            # Rows are already grouped by exam and sorted by time: slice instead of scanning the column.
+            row_start, row_end = offsets.get(exam_id, (0, 0))
+            exam_df = features.iloc[row_start:row_end]
         if start is not None:
             exam_df = exam_df[exam_df["Time"] >= float(start)]
         if end is not None:
@@ -124,6 +492,23 @@ class CPETStudyData:
         payload["institute"] = institute
         return payload
 
+    def _exam_columns(
+        self, exam_id: str, smooth: str, start: Optional[float], end: Optional[float]
+    ) -> Dict[str, np.ndarray]:
+        """Smoothed exam columns as read-only arrays, cached so repeated views skip pandas entirely."""
+        key = (exam_id, smooth, start, end)
+        columns = self._columns_cache.get(key)
+        if columns is None:
+            df = self.load_exam_dataframe(exam_id, start=start, end=end, smooth=smooth)
+            columns = {}
+            for col in df.columns:
+                values = df[col].to_numpy()
+                values = np.ascontiguousarray(values) if values.dtype.kind in "fiub" else values.astype(object)
+                values.setflags(write=False)
+                columns[col] = values
+            self._columns_cache.put(key, columns)
+        return columns
+
     def build_timeseries_payload(
         self,
         exam_id: str,
@@ -132,118 +517,166 @@ class CPETStudyData:
         start: Optional[float] = None,
         end: Optional[float] = None,
         views: Iterable[str] | None = None,
+        precision: str = "f32",
+        table_layout: str = "rows",
     ) -> Dict[str, object]:
+        """Panel series for one exam.
+
+        ``precision="i16"`` replaces each float signal series with ``{"scale", "values"}``, where
+        ``values`` are int16 samples (``I16_MISSING`` for NaN) and ``values * scale`` recovers the
+        signal; enough for pixel-resolution plots at a quarter of the float64 size.
+
+        ``table_layout="columns"`` returns the table as ``{"columns": [...], "data": {col: values}}``
+        (one array per column, ``null`` for columns the exam lacks) instead of one dict per row.
+        """
         views_set = {v.strip().lower() for v in (views or []) if v}
-        df = self.load_exam_dataframe(exam_id, start=start, end=end, smooth=smooth)
-        if df.empty:
-            return {"exam_id": exam_id, "smooth": smooth, "duration_sec": 0, "views": {}, "table": []}
+        cols = self._exam_columns(exam_id, smooth, start, end)
+        n_rows = len(next(iter(cols.values()))) if cols else 0
+        if not n_rows:
+            empty_table: object = []
+            if table_layout == "columns":
+                empty_table = {"columns": list(_TABLE_COLUMNS), "data": {c: [] for c in _TABLE_COLUMNS}}
+            return {"exam_id": exam_id, "smooth": smooth, "duration_sec": 0, "views": {}, "table": empty_table}
 
-        time_values = df["Time"].tolist() if "Time" in df.columns else list(range(len(df)))
+        # Series values are ndarrays where possible; serialize with orjson.OPT_SERIALIZE_NUMPY.
+        time_values = _column_values(cols["Time"]) if "Time" in cols else list(range(n_rows))
         payload: Dict[str, object] = {
             "exam_id": exam_id,
             "smooth": smooth,
-            "duration_sec": float(df["Time"].max()) if "Time" in df.columns else len(df),
+            "duration_sec": _max_time(cols["Time"]) if "Time" in cols else n_rows,
             "views": {},
             "table": [],
         }
 
-        # V-Slope
-        vo2_series = df.get("VO2", pd.Series(dtype=float)).tolist()
-        vco2_series = df.get("VCO2", pd.Series(dtype=float)).tolist()
-        ve_series = df.get("VE", pd.Series(dtype=float)).tolist()
-        hr_series = df.get("HR", pd.Series(dtype=float)).tolist()
-        vt_series = df.get("VT", pd.Series(dtype=float)).tolist()
-        rer_series = df.get("RER", pd.Series(dtype=float)).tolist()
-        peto2_series = df.get("PetO2", pd.Series(dtype=float)).tolist()
-        petco2_series = df.get("PetCO2", pd.Series(dtype=float)).tolist()
-
-        # Panel 1: VE vs Time
-        if not views_set or "panel1" in views_set:
-            payload["views"]["panel1"] = {
-                "time_sec": time_values,
-                "ve": ve_series,
-            }
-
-        # Panel 2: HR vs Time
-        if not views_set or "panel2" in views_set:
-            payload["views"]["panel2"] = {
-                "time_sec": time_values,
-                "hr": hr_series,
-            }
-
-        # Panel 3: VO2 vs Time
-        if not views_set or "panel3" in views_set:
-            payload["views"]["panel3"] = {
-                "time_sec": time_values,
-                "vo2": vo2_series,
-            }
-
-        # Panel 4: VO2 vs VCO2 (second V-Slope / RCP view)
-        if not views_set or "panel4" in views_set:
-            payload["views"]["panel4"] = {
-                "time_sec": time_values,
-                "vo2": vo2_series,
-                "vco2": vco2_series,
-            }
-
-        # Panel 5: Primary V-Slope (same as vslope for backward compatibility)
-        if not views_set or "panel5" in views_set or "vslope" in views_set:
-            payload["views"]["panel5"] = {
-                "time_sec": time_values,
-                "vo2": vo2_series,
-                "vco2": vco2_series,
-            }
-            # legacy key for existing clients
-            payload["views"]["vslope"] = payload["views"]["panel5"]
-
-        # Panel 6
-        if not views_set or "panel6" in views_set:
-            payload["views"]["panel6"] = {
-                "time_sec": time_values,
-                "ve_vo2": df.get("VE_VO2", pd.Series(dtype=float)).tolist(),
-                "ve_vco2": df.get("VE_VCO2", pd.Series(dtype=float)).tolist(),
-            }
-
-        # Panel 9
-        if not views_set or "panel9" in views_set:
-            payload["views"]["panel9"] = {
-                "time_sec": time_values,
-                "peto2": peto2_series,
-                "petco2": petco2_series,
-            }
-
-        # Panel 7: VT vs VE (breathing pattern)
-        if not views_set or "panel7" in views_set:
-            payload["views"]["panel7"] = {
-                "time_sec": time_values,
-                "ve": ve_series,
-                "vt": vt_series,
-            }
-
-        # Panel 8: RER vs Time
-        if not views_set or "panel8" in views_set:
-            payload["views"]["panel8"] = {
-                "time_sec": time_values,
-                "rer": rer_series,
-            }
-
-        table_cols = [
-            "Time",
-            "Load_Phase",
-            "Power_Load",
-            "VO2",
-            "VCO2",
-            "RER",
-            "VE_VO2",
-            "VE_VCO2",
-            "PetO2",
-            "PetCO2",
-            "HR",
-            "VE",
+        # Extract a column only when a requested panel needs it, and only once.
+        series_cache: Dict[str, Any] = {}
+
+        def series(col: str) -> Any:
+            values = series_cache.get(col)
+            if values is None:
+                values = _column_values(cols[col]) if col in cols else []
+                if precision == "i16":
+                    values = _quantize_i16(values)
+                series_cache[col] = values
+            return values
+
+        for view, signals in _PANELS:
+            if views_set and view not in views_set and not (view == "panel5" and "vslope" in views_set):
+                continue
+            panel: Dict[str, Any] = {"time_sec": time_values}
+            for key, col in signals:
+                panel[key] = series(col)
+            payload["views"][view] = panel
+            if view == "panel5":
+                # legacy key for existing clients
+                payload["views"]["vslope"] = panel
+
+        if table_layout == "columns":
+            # Structure of arrays: the cached column buffers go to orjson as-is.
+            data: Dict[str, Any] = {}
+            for col in _TABLE_COLUMNS:
+                if col == "Time" and col not in cols:
+                    data[col] = np.zeros(n_rows)
+                else:
+                    data[col] = _column_values(cols[col]) if col in cols else None
+            payload["table"] = {"columns": list(_TABLE_COLUMNS), "data": data}
+            return payload
+
+        # Build rows from column arrays instead of iterrows(); columns the exam lacks are None.
+        # Cells stay NumPy scalars so float32 values serialize in their short form.
+        if "Time" in cols:
+            time_col = cols["Time"]
+            if time_col.dtype.kind != "f":
+                time_col = time_col.astype(np.float64)
+        else:
+            time_col = np.zeros(n_rows)
+        columns = [
+            time_col if col == "Time" else cols[col] if col in cols else itertools.repeat(None)
+            for col in _TABLE_COLUMNS
         ]
-        for _, row in df.iterrows():
-            entry = {col: row[col] if col in df.columns else None for col in table_cols}
-            entry["Time"] = float(entry.get("Time") or 0.0)
-            payload["table"].append(entry)
+        table = [dict(zip(_TABLE_COLUMNS, row)) for row in zip(*columns)]
+        payload["table"] = table
 
         return payload
+
+    def timeseries_arrow_stream(
+        self,
+        exam_id: str,
+        *,
+        smooth: str = "none",
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        views: Iterable[str] | None = None,
+        batch_rows: int = 4096,
+    ) -> Iterator[bytes]:
+        """Arrow IPC stream of one exam: the table columns plus panel signals, as float32 batches.
+
+        The exam is loaded (and a missing exam raises ``KeyError``) before this returns; the
+        iterator then encodes ``batch_rows`` rows at a time. Schema metadata carries ``exam_id``,
+        ``smooth``, ``duration_sec`` and ``views``, a JSON map of panel key -> column name.
+        """
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Arrow timeseries streams")
+        views_set = {v.strip().lower() for v in (views or []) if v}
+        cols = self._exam_columns(exam_id, smooth, start, end)
+        n_rows = len(next(iter(cols.values()))) if cols else 0
+
+        view_columns: Dict[str, Dict[str, str]] = {}
+        for view, signals in _PANELS:
+            if views_set and view not in views_set and not (view == "panel5" and "vslope" in views_set):
+                continue
+            view_columns[view] = {"time_sec": "Time", **{key: col for key, col in signals}}
+            if view == "panel5":
+                view_columns["vslope"] = view_columns[view]
+        names = list(_TABLE_COLUMNS)
+        names += [c for mapping in view_columns.values() for c in mapping.values() if c not in names]
+
+        arrays: List[Any] = []
+        for col in names:
+            if col == "Time" and col not in cols:
+                arrays.append(pa.array(np.arange(n_rows, dtype=np.float32)))
+            elif col not in cols:
+                arrays.append(pa.nulls(n_rows, type=pa.float32()))
+            elif cols[col].dtype.kind in "fiub":
+                arrays.append(pa.array(cols[col].astype(np.float32), from_pandas=True))
+            else:
+                arrays.append(pa.array(pd.Series(cols[col]).astype("string"), type=pa.string(), from_pandas=True))
+        duration = _max_time(cols["Time"]) if "Time" in cols and n_rows else n_rows
+        schema = pa.schema(
+            [pa.field(name, arr.type) for name, arr in zip(names, arrays)],
+            metadata={
+                "exam_id": exam_id,
+                "smooth": smooth,
+                "duration_sec": repr(duration),
+                "views": orjson.dumps(view_columns),
+            },
+        )
+        table = pa.Table.from_arrays(arrays, schema=schema)
+
+        def encode() -> Iterator[bytes]:
+            sink = io.BytesIO()
+            with pa.ipc.new_stream(sink, schema) as writer:
+                for batch in table.to_batches(max_chunksize=batch_rows):
+                    writer.write_batch(batch)
+                    yield sink.getvalue()
+                    sink.seek(0)
+                    sink.truncate()
+            yield sink.getvalue()
+
+        return encode()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .config import settings
+
+    parser = argparse.ArgumentParser(description="One-time CPET data layout migrations.")
+    parser.add_argument("layout", choices=["arrow", "chunked"], help="arrow: Feather files; chunked: float32 HDF5")
+    parser.add_argument("data_file", nargs="?", type=Path, default=settings.data_file)
+    args = parser.parse_args()
+
+    study = CPETStudyData(args.data_file)
+    written = study.export_arrow_tables() if args.layout == "arrow" else study.export_chunked_features()
+    for item in written:
+        print(item)
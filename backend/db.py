@@ -1,18 +1,26 @@
 from __future__ import annotations
 
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import Dict, Iterator, List
 
 from .config import settings
 
+# One connection per (thread, db path), reused across requests instead of reconnecting each time.
+_pool = threading.local()
+_pool_lock = threading.Lock()
+_all_conns: List[sqlite3.Connection] = []
+_generation = 0  # bumped by close_pool() so other threads drop their closed connections
+
 
 def init_db(db_path: Path | None = None) -> None:
     """Initialize SQLite tables for annotations and consensus."""
     path = db_path or settings.db_path
     path.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL;")
     cur = conn.cursor()
     cur.execute(
         """
@@ -24,10 +32,22 @@ def init_db(db_path: Path | None = None) -> None:
             at_time REAL NOT NULL,
             smoothing TEXT,
             notes TEXT,
-            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            plan_id TEXT
         );
         """
     )
+    # Databases created before plan_id existed.
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(annotations);")}
+    if "plan_id" not in columns:
+        cur.execute("ALTER TABLE annotations ADD COLUMN plan_id TEXT;")
+    # recompute_consensus: latest row per role for one exam, read in index order.
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_annot_exam_role_created ON annotations(exam_id, role, created_at DESC, id DESC);"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_annot_exam_reader ON annotations(exam_id, reader_id, at_time);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_annot_exam_time ON annotations(exam_id, at_time);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_annot_plan ON annotations(plan_id) WHERE plan_id IS NOT NULL;")
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS consensus (
@@ -46,12 +66,45 @@ def init_db(db_path: Path | None = None) -> None:
     conn.close()
 
 
+def _pooled_conn(path: Path) -> sqlite3.Connection:
+    conns: Dict[Path, sqlite3.Connection] | None = getattr(_pool, "conns", None)
+    if conns is None or getattr(_pool, "generation", None) != _generation:
+        conns = _pool.conns = {}
+        _pool.generation = _generation
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, check_same_thread=False)
+        # Per-connection settings, applied once; journal_mode=WAL is persisted by init_db.
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA mmap_size=268435456;")
+        conn.execute("PRAGMA cache_size=-65536;")
+        conns[path] = conn
+        with _pool_lock:
+            _all_conns.append(conn)
+    return conn
+
+
 @contextmanager
 def db_conn(db_path: Path | None = None) -> Iterator[sqlite3.Connection]:
     path = db_path or settings.db_path
-    conn = sqlite3.connect(path)
+    conn = _pooled_conn(path)
     try:
         yield conn
         conn.commit()
-    finally:
-        conn.close()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def close_pool() -> None:
+    """Close every pooled connection (call on shutdown)."""
+    global _generation
+    with _pool_lock:
+        conns = list(_all_conns)
+        _all_conns.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
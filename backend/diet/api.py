@@ -9,6 +9,7 @@ from datetime import datetime
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
 
 from ..auth.security import get_current_user
 from .models import (
@@ -19,8 +20,14 @@ from .models import (
     DietRecognizeResponse,
     DietSummaryResponse,
 )
-from .storage import create_entry_record, get_device_entries, get_device_summary, save_entry
-from .vision import recognize_food
+from .storage import (
+    count_device_entries,
+    create_entry_record,
+    get_device_entries,
+    get_device_summary,
+    save_entry,
+)
+from .vision import recognize_food_async
 
 router = APIRouter(prefix="/api/diet", tags=["Diet"])
 
@@ -36,13 +43,14 @@ def _decode_image_or_400(image_base64: str, max_bytes: int) -> bytes:
 
 
 @router.post("/recognize", response_model=DietRecognizeResponse, summary="Food photo recognition (no storage)")
-def recognize(request: DietRecognizeRequest, user: dict = Depends(get_current_user)):  # noqa: ARG001
+async def recognize(request: DietRecognizeRequest, user: dict = Depends(get_current_user)):  # noqa: ARG001
     max_bytes = int(os.environ.get("DIET_MAX_IMAGE_BYTES") or "1500000")
     image_bytes = _decode_image_or_400(request.image_base64, max_bytes=max_bytes)
 
     request_id = str(uuid4())
     try:
-        vision_result, model_name = recognize_food(
+        # Async client: the model round-trip (seconds) doesn't pin a threadpool worker.
+        vision_result, model_name = await recognize_food_async(
             image_bytes=image_bytes,
             image_mime=request.image_mime,
             locale=request.locale,
@@ -95,9 +103,14 @@ def list_entries(
     offset: int = Query(default=0, ge=0),
     user: dict = Depends(get_current_user),
 ):
-    entries = get_device_entries(user["id"], device_id, start=start, end=end, plan_id=plan_id)
-    sliced = entries[offset : offset + limit]
-    return DietEntriesResponse(device_id=device_id, count=len(entries), entries=sliced)
+    entries = get_device_entries(
+        user["id"], device_id, start=start, end=end, plan_id=plan_id, limit=limit, offset=offset
+    )
+    count = count_device_entries(user["id"], device_id, start=start, end=end, plan_id=plan_id)
+    # Entries are built from trusted stored rows; serialize directly instead of letting the
+    # response_model re-validate every entry.
+    resp = DietEntriesResponse.model_construct(device_id=device_id, count=count, entries=entries)
+    return Response(content=resp.model_dump_json(), media_type="application/json")
 
 
 @router.get("/summary/{device_id}", response_model=DietSummaryResponse, summary="Daily summary for a device")
@@ -1,18 +1,39 @@
 # -*- coding: utf-8 -*-
-"""Diet — JSON file storage (no image retention)."""
+"""Diet — JSON file storage indexed in the app DB (no image retention).
+
+Entries are still written as one JSON file each, but every write also goes to the
+``diet_entries`` table so listing by device, date range and plan is one indexed query.
+Entry files from older versions are imported on first access.
+"""
 
 from __future__ import annotations
 
-import json
+import os
+import sqlite3
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 from uuid import uuid4
 
-from .models import DietDailySummary, DietEntry, NutritionTotals
+import numpy as np
+import orjson
+
+from .models import DietDailySummary, DietEntry, FoodItem, MealType, NutritionTotals
 
+from ..app_db import db_conn
 from ..config import settings
 
+# (user_id, device dir) pairs whose legacy entry files have been imported in this process.
+_indexed_devices: Set[Tuple[str, str]] = set()
+
+_INSERT_ENTRY_SQL = """
+    INSERT OR REPLACE INTO diet_entries (
+        entry_id, user_id, device_id, eaten_at, meal_type, plan_id,
+        calories_kcal, protein_g, carbs_g, fat_g, entry_json
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 
 def _data_root_for(user_id: str) -> Path:
     return settings.data_root / "users" / user_id / "diet"
@@ -22,16 +43,22 @@ def _ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def compute_totals(items: List[Dict[str, Any]]) -> NutritionTotals:
-    calories = 0.0
-    protein = 0.0
-    carbs = 0.0
-    fat = 0.0
-    for item in items:
-        calories += float(item.get("calories_kcal") or 0.0)
-        protein += float(item.get("protein_g") or 0.0)
-        carbs += float(item.get("carbs_g") or 0.0)
-        fat += float(item.get("fat_g") or 0.0)
+_MACRO_FIELDS = ("calories_kcal", "protein_g", "carbs_g", "fat_g")
+
+
+def compute_totals(items: Sequence[Dict[str, Any] | FoodItem]) -> NutritionTotals:
+    # One flat pass over the items into an (n, 4) array, then a single column-wise reduction.
+    # FoodItem models are read by attribute, so callers don't need to model_dump() them first.
+    values = np.fromiter(
+        (
+            float((item.get(key) if isinstance(item, dict) else getattr(item, key, None)) or 0.0)
+            for item in items
+            for key in _MACRO_FIELDS
+        ),
+        dtype=np.float64,
+        count=len(items) * len(_MACRO_FIELDS),
+    )
+    calories, protein, carbs, fat = values.reshape(-1, len(_MACRO_FIELDS)).sum(axis=0).tolist()
     return NutritionTotals(
         calories_kcal=round(calories, 1),
         protein_g=round(protein, 1),
@@ -49,10 +76,33 @@ def save_entry(
     device_dir = root / entry.device_id
     _ensure_dir(device_dir)
     fp = device_dir / f"{entry.entry_id}.json"
-    fp.write_text(entry.model_dump_json(ensure_ascii=False, indent=2), encoding="utf-8")
+    # Serialize once (compact UTF-8) for both the file and the index row.
+    data = orjson.dumps(entry.model_dump(mode="json"))
+    fp.write_bytes(data)
+    with db_conn(settings.app_db_path) as conn:
+        _index_entry(conn, user_id, entry, data.decode("utf-8"))
     return entry.entry_id
 
 
+def _index_entry(conn: sqlite3.Connection, user_id: str, entry: DietEntry, entry_json: Optional[str] = None) -> None:
+    conn.execute(
+        _INSERT_ENTRY_SQL,
+        (
+            entry.entry_id,
+            user_id,
+            entry.device_id,
+            entry.eaten_at,
+            entry.meal_type.value,
+            entry.plan_id,
+            entry.totals.calories_kcal,
+            entry.totals.protein_g,
+            entry.totals.carbs_g,
+            entry.totals.fat_g,
+            entry_json if entry_json is not None else entry.model_dump_json(),
+        ),
+    )
+
+
 def create_entry_record(
     *,
     device_id: str,
@@ -64,16 +114,17 @@ def create_entry_record(
     warnings: List[str],
     plan_id: Optional[str] = None,
 ) -> DietEntry:
+    # Inputs come from an already-validated request model, so skip a second validation pass.
     now = datetime.utcnow().isoformat() + "Z"
     entry_id = str(uuid4())
     totals = compute_totals(items)
-    return DietEntry(
+    return DietEntry.model_construct(
         entry_id=entry_id,
         device_id=device_id,
         created_at=now,
         eaten_at=eaten_at,
-        meal_type=meal_type,
-        items=items,
+        meal_type=MealType(meal_type),
+        items=[FoodItem.model_construct(**item) for item in items],
         totals=totals,
         notes=notes,
         source=source,
@@ -82,27 +133,98 @@ def create_entry_record(
     )
 
 
-def _iter_device_entries(device_id: str, data_root: Path) -> List[DietEntry]:
+def _backfill_index(user_id: str, device_id: str, data_root: Path) -> None:
+    """Import entry files that are not in ``diet_entries`` yet (once per device per process)."""
     device_dir = data_root / device_id
-    if not device_dir.exists():
-        return []
+    key = (user_id, str(device_dir))
+    if key in _indexed_devices:
+        return
+    names: List[str] = []
+    if device_dir.exists():
+        with os.scandir(device_dir) as it:
+            names = [e.name for e in it if e.name.endswith(".json") and e.is_file()]
+    if names:
+        with db_conn(settings.app_db_path) as conn:
+            known = {
+                row["entry_id"]
+                for row in conn.execute(
+                    "SELECT entry_id FROM diet_entries WHERE user_id = ? AND device_id = ?", (user_id, device_id)
+                )
+            }
+            for name in names:
+                if name[: -len(".json")] in known:
+                    continue
+                try:
+                    entry = DietEntry.model_validate_json((device_dir / name).read_bytes())
+                except Exception:
+                    continue
+                _index_entry(conn, user_id, entry)
+    _indexed_devices.add(key)
+
+
+def _entry_from_json(data: str) -> DietEntry:
+    """Rebuild an entry from ``entry_json`` without validation: every row was written by save_entry."""
+    raw = orjson.loads(data)
+    raw["meal_type"] = MealType(raw["meal_type"])
+    raw["items"] = [FoodItem.model_construct(**item) for item in raw.get("items") or []]
+    raw["totals"] = NutritionTotals.model_construct(**(raw.get("totals") or {}))
+    return DietEntry.model_construct(**raw)
+
+
+def _entries_filter(
+    user_id: str,
+    device_id: str,
+    start: Optional[str],
+    end: Optional[str],
+    plan_id: Optional[str],
+) -> Tuple[str, List[Any]]:
+    where = "user_id = ? AND device_id = ?"
+    params: List[Any] = [user_id, device_id]
+    if start or end:
+        # eaten_at[:10] <= end  <=>  eaten_at <= end + U+FFFF (binary collation), so both
+        # bounds stay a plain range on the indexed column.
+        where += " AND eaten_at BETWEEN ? AND ?"
+        params.extend([start or "0000-01-01", (end or "9999-12-31") + "\uffff"])
+    if plan_id:
+        where += " AND plan_id = ?"
+        params.append(plan_id)
+    return where, params
+
+
+def get_device_entries(
+    user_id: str,
+    device_id: str,
+    *,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    plan_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    data_root: Path | None = None,
+) -> List[DietEntry]:
+    """Entries newest first; `limit`/`offset` page in SQL so only the returned rows are parsed."""
+    root = data_root or _data_root_for(user_id)
+    _backfill_index(user_id, device_id, root)
+
+    where, params = _entries_filter(user_id, device_id, start, end, plan_id)
+    # LIMIT -1 is "no limit" in SQLite.
+    params.extend([-1 if limit is None else int(limit), int(offset)])
+    with db_conn(settings.app_db_path) as conn:
+        rows = conn.execute(
+            f"SELECT entry_json FROM diet_entries WHERE {where} ORDER BY eaten_at DESC, entry_id DESC LIMIT ? OFFSET ?",
+            params,
+        ).fetchall()
 
     entries: List[DietEntry] = []
-    for fp in sorted(device_dir.glob("*.json"), reverse=True):
+    for row in rows:
         try:
-            raw = json.loads(fp.read_text(encoding="utf-8"))
-            entries.append(DietEntry.model_validate(raw))
+            entries.append(_entry_from_json(row["entry_json"]))
         except Exception:
             continue
     return entries
 
 
-def _date_prefix(iso8601: str) -> str:
-    # Most ISO8601 strings start with YYYY-MM-DD; keep it robust without strict parsing.
-    return (iso8601 or "")[:10]
-
-
-def get_device_entries(
+def count_device_entries(
     user_id: str,
     device_id: str,
     *,
@@ -110,24 +232,27 @@ def get_device_entries(
     end: Optional[str] = None,
     plan_id: Optional[str] = None,
     data_root: Path | None = None,
-) -> List[DietEntry]:
+) -> int:
     root = data_root or _data_root_for(user_id)
-    entries = _iter_device_entries(device_id, root)
-    if not start and not end:
-        return entries
+    _backfill_index(user_id, device_id, root)
+
+    where, params = _entries_filter(user_id, device_id, start, end, plan_id)
+    with db_conn(settings.app_db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM diet_entries WHERE {where}", params).fetchone()[0]
 
-    start_date = start or "0000-01-01"
-    end_date = end or "9999-12-31"
 
-    def in_range(entry: DietEntry) -> bool:
-        d = _date_prefix(entry.eaten_at)
-        if not (start_date <= d <= end_date):
-            return False
-        if plan_id and entry.plan_id != plan_id:
-            return False
-        return True
+_SUMS_SQL = "SUM(calories_kcal), SUM(protein_g), SUM(carbs_g), SUM(fat_g)"
 
-    return [e for e in entries if in_range(e)]
+
+def _totals_from_row(row: sqlite3.Row, offset: int = 0) -> NutritionTotals:
+    # Round in Python rather than with SQL ROUND(): SQLite rounds halves away from zero, which
+    # would change existing summaries (e.g. 100.25 -> 100.3 instead of 100.2).
+    return NutritionTotals(
+        calories_kcal=round(row[offset] or 0.0, 1),
+        protein_g=round(row[offset + 1] or 0.0, 1),
+        carbs_g=round(row[offset + 2] or 0.0, 1),
+        fat_g=round(row[offset + 3] or 0.0, 1),
+    )
 
 
 def get_device_summary(
@@ -140,52 +265,23 @@ def get_device_summary(
     data_root: Path | None = None,
 ) -> Dict[str, Any]:
     root = data_root or _data_root_for(user_id)
-    entries = get_device_entries(user_id, device_id, start=start, end=end, plan_id=plan_id, data_root=root)
-
-    per_day: Dict[str, Dict[str, Any]] = {}
-    totals = NutritionTotals()
-
-    for entry in entries:
-        day = _date_prefix(entry.eaten_at)
-        if day not in per_day:
-            per_day[day] = {"totals": NutritionTotals(), "entry_count": 0}
-        per_day[day]["entry_count"] += 1
-        day_totals: NutritionTotals = per_day[day]["totals"]
-        day_totals.calories_kcal += entry.totals.calories_kcal
-        day_totals.protein_g += entry.totals.protein_g
-        day_totals.carbs_g += entry.totals.carbs_g
-        day_totals.fat_g += entry.totals.fat_g
-
-        totals.calories_kcal += entry.totals.calories_kcal
-        totals.protein_g += entry.totals.protein_g
-        totals.carbs_g += entry.totals.carbs_g
-        totals.fat_g += entry.totals.fat_g
-
-    days: List[DietDailySummary] = []
-    for day in sorted(per_day.keys()):
-        day_totals = per_day[day]["totals"]
-        days.append(
-            DietDailySummary(
-                date=day,
-                totals=NutritionTotals(
-                    calories_kcal=round(day_totals.calories_kcal, 1),
-                    protein_g=round(day_totals.protein_g, 1),
-                    carbs_g=round(day_totals.carbs_g, 1),
-                    fat_g=round(day_totals.fat_g, 1),
-                ),
-                entry_count=per_day[day]["entry_count"],
-            )
-        )
+    _backfill_index(user_id, device_id, root)
 
+    # Per-day and overall sums come straight from the per-entry totals columns.
+    where, params = _entries_filter(user_id, device_id, start, end, plan_id)
+    with db_conn(settings.app_db_path) as conn:
+        day_rows = conn.execute(
+            f"SELECT substr(eaten_at, 1, 10) AS day, COUNT(*), {_SUMS_SQL} FROM diet_entries WHERE {where} "
+            "GROUP BY day ORDER BY day",
+            params,
+        ).fetchall()
+        total_row = conn.execute(f"SELECT {_SUMS_SQL} FROM diet_entries WHERE {where}", params).fetchone()
+
+    days = [DietDailySummary(date=row[0], totals=_totals_from_row(row, 2), entry_count=row[1]) for row in day_rows]
     return {
         "device_id": device_id,
         "start": start,
         "end": end,
-        "totals": NutritionTotals(
-            calories_kcal=round(totals.calories_kcal, 1),
-            protein_g=round(totals.protein_g, 1),
-            carbs_g=round(totals.carbs_g, 1),
-            fat_g=round(totals.fat_g, 1),
-        ),
+        "totals": _totals_from_row(total_row),
         "days": days,
     }
@@ -4,165 +4,256 @@
 from __future__ import annotations
 
 import ast
+import asyncio
 import base64
+import io
 import json
 import logging
 import os
 import re
+import threading
+import time
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import httpx
+import orjson
+
+try:
+    import pybase64
+except ImportError:  # pragma: no cover - optional dependency
+    pybase64 = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+try:
+    import h2
+except ImportError:  # pragma: no cover - optional dependency
+    h2 = None
 
 from ..config import settings
-from .models import DietVisionRawResult, NutritionTotals
+from .models import DietVisionRawResult, FoodItem, NutritionTotals
 from .storage import compute_totals
 
 
+# Patterns used on every recognition; compiled once at import.
+# No \b before the token: it can't match ahead of "-", which left "-Infinity" as "-null".
+_NON_FINITE_RE = re.compile(r"(?<![\w.])(?:NaN|-?Infinity)\b", re.IGNORECASE)
+_NULL_RE = re.compile(r"\bnull\b", re.IGNORECASE)
+_TRUE_RE = re.compile(r"\btrue\b", re.IGNORECASE)
+_FALSE_RE = re.compile(r"\bfalse\b", re.IGNORECASE)
+# A comma whose next non-blank char closes an object/array, or a string opener to skip over.
+_COMMA_OR_QUOTE_RE = re.compile(r',(?=[ \t\r\n]*[}\]])|"')
+_BRACE_OR_QUOTE_RE = re.compile(r'[{}"]')
+
+
+# One pooled client per process: vision calls always go to the same OpenCode host, so keep-alive
+# connections skip a TCP (and TLS) handshake per recognition. Timeouts are set per request.
+# With h2 installed, https endpoints negotiate HTTP/2 and multiplex calls over one connection
+# (plain-http OpenCode stays on HTTP/1.1). retries only re-attempts failed connects, never a
+# request that was already sent.
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+_LIMITS = httpx.Limits(max_keepalive_connections=10, max_connections=20)
+
+
+def _get_client() -> httpx.Client:
+    global _client
+    client = _client
+    if client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    follow_redirects=True,
+                    transport=httpx.HTTPTransport(http2=h2 is not None, limits=_LIMITS, retries=1),
+                )
+            client = _client
+    return client
+
+
+def close_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+# The async client is bound to the event loop it was created on; a call from another loop
+# (e.g. a fresh test client) gets a new one.
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            follow_redirects=True,
+            transport=httpx.AsyncHTTPTransport(http2=h2 is not None, limits=_LIMITS, retries=1),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_clients() -> None:
+    """Shutdown hook: close both pooled clients."""
+    global _async_client, _async_client_loop
+    close_client()
+    client, _async_client, _async_client_loop = _async_client, None, None
+    if client is not None:
+        await client.aclose()
+
+
+# (session_url, configured agent) -> monotonic deadline. When a custom agent fails and the
+# "general" retry succeeds, later calls go straight to "general" instead of uploading the
+# image to the broken agent first; after the TTL the configured agent is tried again.
+_AGENT_FALLBACK_TTL = 600.0
+_agent_fallback: Dict[Tuple[str, str], float] = {}
+
+
+def _effective_agent(session_url: str, agent: str) -> str:
+    deadline = _agent_fallback.get((session_url, agent))
+    if deadline is None:
+        return agent
+    if time.monotonic() >= deadline:
+        _agent_fallback.pop((session_url, agent), None)
+        return agent
+    return "general"
+
+
 @dataclass(frozen=True)
 class VisionSettings:
     base_url: str
     model: str
     timeout: float
     agent: str
+    max_dim: int = 0
+    trust_model: bool = False
+
+
+def _string_end(text: str, start: int) -> int:
+    """Index of the quote closing the string opened at `start`, or len(text) if it never closes."""
+    # The closing quote is the first one after an even run of backslashes.
+    k = start + 1
+    while True:
+        k = text.find("\"", k)
+        if k == -1:
+            return len(text)
+        b = k - 1
+        while b > start and text[b] == "\\":
+            b -= 1
+        if (k - 1 - b) % 2 == 0:
+            return k
+        k += 1
 
 
 def _remove_trailing_commas(text: str) -> str:
     """Remove trailing commas in JSON/JSONC while preserving string literals."""
+    # Jump between commas-before-a-closer and string openers with the regex engine and copy
+    # the runs in between as slices, instead of stepping through the text one char at a time.
     out: list[str] = []
-    in_str = False
-    escaped = False
+    start = 0
     i = 0
-    while i < len(text):
-        ch = text[i]
-        if in_str:
-            out.append(ch)
-            if escaped:
-                escaped = False
-            elif ch == "\\":
-                escaped = True
-            elif ch == "\"":
-                in_str = False
-            i += 1
-            continue
-
-        if ch == "\"":
-            in_str = True
-            out.append(ch)
-            i += 1
+    n = len(text)
+    while True:
+        m = _COMMA_OR_QUOTE_RE.search(text, i)
+        if m is None:
+            break
+        j = m.start()
+        if text[j] == ",":
+            out.append(text[start:j])
+            start = i = j + 1
             continue
-
-        if ch == ",":
-            j = i + 1
-            while j < len(text) and text[j] in " \t\r\n":
-                j += 1
-            if j < len(text) and text[j] in "}]":
-                i += 1
-                continue
-
-        out.append(ch)
-        i += 1
+        i = _string_end(text, j) + 1
+        if i >= n:
+            break
+    out.append(text[start:])
     return "".join(out)
 
 
-def _strip_jsonc(text: str) -> str:
-    """Strip JSONC comments without breaking URLs/strings, then remove trailing commas."""
-    out: list[str] = []
-    in_str = False
-    escaped = False
-    i = 0
-    while i < len(text):
-        ch = text[i]
-        if in_str:
-            out.append(ch)
-            if escaped:
-                escaped = False
-            elif ch == "\\":
-                escaped = True
-            elif ch == "\"":
-                in_str = False
-            i += 1
-            continue
-
-        if ch == "\"":
-            in_str = True
-            out.append(ch)
-            i += 1
-            continue
-
-        if ch == "/" and i + 1 < len(text):
-            nxt = text[i + 1]
-            if nxt == "/":
-                i += 2
-                while i < len(text) and text[i] not in "\n\r":
-                    i += 1
-                continue
-            if nxt == "*":
-                i += 2
-                while i + 1 < len(text) and not (text[i] == "*" and text[i + 1] == "/"):
-                    i += 1
-                i += 2 if i + 1 < len(text) else 1
-                continue
-
-        out.append(ch)
-        i += 1
-
-    return _remove_trailing_commas("".join(out))
-
-
-def _load_opencode_config() -> Dict[str, Any] | None:
-    candidates = []
-    config_path = settings.agent_config_path
-    if config_path:
-        candidates.append(config_path)
-    opencode_dir = settings.opencode_directory
-    candidates.extend(
-        [
-            opencode_dir / ".opencode" / "opencode.jsonc",
-            opencode_dir / ".opencode" / "opencode.json",
-        ]
-    )
-    for path in candidates:
-        if not path or not path.exists():
-            continue
-        try:
-            raw = path.read_text(encoding="utf-8")
-            return json.loads(_strip_jsonc(raw))
-        except Exception:
-            continue
-    return None
+def _json_loads(raw: str | bytes) -> Any:
+    # orjson first; stdlib json still takes what orjson rejects (NaN/Infinity, >64-bit ints).
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return json.loads(raw)
 
 
-def _resolve_default_model(config: Dict[str, Any] | None) -> str | None:
-    if not config:
-        return None
-    model = config.get("model") or config.get("agent", {}).get("model")
-    return model if isinstance(model, str) and model else None
+_VISION_ENV = (
+    "DIET_VISION_BASE_URL",
+    "DIET_VISION_MODEL",
+    "DIET_VISION_TIMEOUT",
+    "DIET_VISION_AGENT",
+    "DIET_VISION_MAX_DIM",
+    "DIET_VISION_TRUST_MODEL",
+)
 
 
 def resolve_vision_settings() -> VisionSettings:
-    base_url = (os.environ.get("DIET_VISION_BASE_URL") or settings.opencode_base_url).rstrip("/")
+    # Keyed by the raw env values, so changing them at runtime still takes effect.
+    return _vision_settings(*(os.environ.get(name) for name in _VISION_ENV))
+
+
+@lru_cache(maxsize=8)
+def _vision_settings(
+    base_url_env: str | None,
+    model_env: str | None,
+    timeout_env: str | None,
+    agent_env: str | None,
+    max_dim_env: str | None,
+    trust_model_env: str | None,
+) -> VisionSettings:
+    base_url = (base_url_env or settings.opencode_base_url).rstrip("/")
     # NOTE: Do not fall back to OpenCode's global `model` config, which is often text-only.
     # If the caller doesn't set DIET_VISION_MODEL, default to a known image-capable model.
-    model = (os.environ.get("DIET_VISION_MODEL") or "").strip() or "opencode/kimi-k2.5-free"
-    timeout = float(os.environ.get("DIET_VISION_TIMEOUT") or settings.qwen_timeout)
+    model = (model_env or "").strip() or "opencode/kimi-k2.5-free"
+    timeout = float(timeout_env or settings.qwen_timeout)
     # Use a built-in agent by default to avoid depending on file-watcher reloads.
     # (Project default agent is often "clinical", which can break JSON-only output.)
-    agent = (os.environ.get("DIET_VISION_AGENT") or "general").strip() or "general"
+    agent = (agent_env or "general").strip() or "general"
+    # Longest image side sent to the model; 0 (default) uploads images as-is.
+    max_dim = max(int(max_dim_env or 0), 0)
+    # Build the result without re-validating the normalized model output (see _build_result).
+    trust_model = (trust_model_env or "").strip() in {"1", "true", "True"}
     return VisionSettings(
         base_url=base_url,
         model=model,
         timeout=timeout,
         agent=agent,
+        max_dim=max_dim,
+        trust_model=trust_model,
     )
 
 
+def reset_vision_settings_cache() -> None:
+    """Forget cached settings and derived request state (tests, or after changing `settings`)."""
+    _vision_settings.cache_clear()
+    _session_url.cache_clear()
+    _message_envelope.cache_clear()
+    _agent_fallback.clear()
+
+
+def _strip_code_fence(cleaned: str) -> str:
+    """Drop a leading ```/```json fence and a trailing ``` from already-stripped model output."""
+    if cleaned.startswith("```"):
+        cleaned = cleaned[3:]
+        if cleaned[:4].lower() == "json":
+            cleaned = cleaned[4:]
+        cleaned = cleaned.lstrip()
+    # The input is already stripped, so the rstrip only bites when a closing fence came off.
+    return cleaned.removesuffix("```").rstrip()
+
+
 def _extract_json(text: str) -> str:
-    cleaned = text.strip()
-    cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r"\s*```$", "", cleaned)
+    cleaned = _strip_code_fence(text.strip())
 
     start = cleaned.find("{")
     end = cleaned.rfind("}")
@@ -171,51 +262,39 @@ def _extract_json(text: str) -> str:
     return cleaned[start : end + 1]
 
 
-def _iter_json_object_candidates(text: str) -> list[str]:
-    """Extract balanced {...} candidates from arbitrary text.
+def _iter_json_object_candidates(text: str) -> Iterator[str]:
+    """Yield balanced {...} candidates from arbitrary text.
 
     Models sometimes wrap JSON with extra prose or include multiple JSON objects.
-    We scan for balanced braces while respecting string literals.
+    We scan for balanced braces while respecting string literals; candidates are yielded as
+    they close, so a caller that accepts the first one never scans the rest of the text.
     """
-    cleaned = text.strip()
-    cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r"\s*```$", "", cleaned)
+    cleaned = _strip_code_fence(text.strip())
 
-    candidates: list[str] = []
-    in_str = False
-    escaped = False
+    # Jump between braces and string openers with the regex engine; string bodies are skipped
+    # with str.find, so plain text is never walked character by character.
     depth = 0
-    start_idx: int | None = None
-
-    for i, ch in enumerate(cleaned):
-        if in_str:
-            if escaped:
-                escaped = False
-            elif ch == "\\":
-                escaped = True
-            elif ch == "\"":
-                in_str = False
-            continue
-
+    start_idx = 0
+    i = 0
+    while True:
+        m = _BRACE_OR_QUOTE_RE.search(cleaned, i)
+        if m is None:
+            return
+        j = m.start()
+        ch = cleaned[j]
         if ch == "\"":
-            in_str = True
-            continue
-
-        if ch == "{":
+            i = _string_end(cleaned, j) + 1
+        elif ch == "{":
             if depth == 0:
-                start_idx = i
+                start_idx = j
             depth += 1
-            continue
-
-        if ch == "}":
+            i = j + 1
+        else:
             if depth > 0:
                 depth -= 1
-                if depth == 0 and start_idx is not None:
-                    candidates.append(cleaned[start_idx : i + 1])
-                    start_idx = None
-            continue
-
-    return candidates
+                if depth == 0:
+                    yield cleaned[start_idx : j + 1]
+            i = j + 1
 
 
 def _sanitize_json_like(text: str) -> str:
@@ -223,33 +302,68 @@ def _sanitize_json_like(text: str) -> str:
     # and non-finite floats.
     cleaned = text
     cleaned = cleaned.replace("：", ":").replace("，", ",")
+    # str.replace stays: it is a memchr-speed no-op when the char is absent, while str.translate
+    # with a non-ASCII table walks the text char by char (20x+ slower on typical output).
     cleaned = cleaned.replace("“", "\"").replace("”", "\"").replace("‘", "'").replace("’", "'")
     cleaned = _remove_trailing_commas(cleaned)
-    cleaned = re.sub(r"\bNaN\b", "null", cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r"\b-?Infinity\b", "null", cleaned, flags=re.IGNORECASE)
-    return cleaned
+    return _NON_FINITE_RE.sub("null", cleaned)
+
+
+# Replies worth recovering are a few KB of JSON; past this the candidate scan and its
+# sanitize/literal_eval retries only burn time on garbage.
+_PARSE_SCAN_LIMIT = 128 * 1024
 
 
 def _parse_model_output_json(content: str) -> Dict[str, Any]:
     last_error: Exception | None = None
 
+    # Fast path for the usual reply, a bare (or fenced) object: for valid JSON the first
+    # balanced candidate would be the whole text anyway, so parse it without the brace scan.
+    cleaned = _strip_code_fence(content.strip())
+    if cleaned.startswith("{") and cleaned.endswith("}"):
+        try:
+            parsed = _json_loads(cleaned)
+            if isinstance(parsed, dict):
+                return parsed
+        except Exception as exc:
+            last_error = exc
+
+    if len(content) > _PARSE_SCAN_LIMIT:
+        logging.getLogger(__name__).info(
+            "diet vision output is %d chars; scanning only the first %d",
+            len(content),
+            _PARSE_SCAN_LIMIT,
+        )
+        content = content[:_PARSE_SCAN_LIMIT]
+
     for candidate in _iter_json_object_candidates(content):
+        # Well-formed output (the common case) parses on the first slice, before any sanitizing.
+        try:
+            parsed = _json_loads(candidate)
+            if isinstance(parsed, dict):
+                return parsed
+        except Exception as exc:
+            last_error = exc
+
+        # When sanitizing changes nothing, retrying the same text would only fail the same way.
         sanitized = _sanitize_json_like(candidate)
-        for attempt in (candidate, sanitized):
+        attempts: Tuple[str, ...] = (candidate,)
+        if sanitized != candidate:
+            attempts = (candidate, sanitized)
             try:
-                parsed = json.loads(attempt)
+                parsed = _json_loads(sanitized)
                 if isinstance(parsed, dict):
                     return parsed
             except Exception as exc:
                 last_error = exc
 
         # As a fallback, try parsing Python-literal-ish dicts (single quotes/None/True/False).
-        for py_candidate in (candidate, sanitized):
+        for py_candidate in attempts:
             try:
                 py = py_candidate
-                py = re.sub(r"\bnull\b", "None", py, flags=re.IGNORECASE)
-                py = re.sub(r"\btrue\b", "True", py, flags=re.IGNORECASE)
-                py = re.sub(r"\bfalse\b", "False", py, flags=re.IGNORECASE)
+                py = _NULL_RE.sub("None", py)
+                py = _TRUE_RE.sub("True", py)
+                py = _FALSE_RE.sub("False", py)
                 parsed = ast.literal_eval(py)
                 if isinstance(parsed, dict):
                     return parsed
@@ -258,17 +372,23 @@ def _parse_model_output_json(content: str) -> Dict[str, Any]:
 
     # Keep previous behavior for minimal changes in error messaging.
     try:
-        return json.loads(_sanitize_json_like(_extract_json(content)))
+        return _json_loads(_sanitize_json_like(_extract_json(content)))
     except Exception as exc:
         last_error = exc
 
     raise ValueError(f"Failed to parse model JSON: {last_error}") from last_error
 
 
+# Upper bound on reply text joined from parts; a food-recognition answer is a few KB, so
+# anything near this is a runaway stream and is cut rather than copied whole.
+_MAX_CONTENT_LEN = 1 << 20
+
+
 def _concat_text_parts(parts: object) -> str:
     if not isinstance(parts, list):
         return ""
     out: list[str] = []
+    total = 0
     for part in parts:
         if not isinstance(part, dict):
             continue
@@ -279,134 +399,128 @@ def _concat_text_parts(parts: object) -> str:
             val = part.get(key)
             if isinstance(val, str) and val:
                 out.append(val)
+                total += len(val)
                 break
+        if total >= _MAX_CONTENT_LEN:
+            out[-1] = out[-1][: len(out[-1]) - (total - _MAX_CONTENT_LEN)]
+            break
     return "".join(out)
 
 
+def _choice_texts(choice: object) -> Iterator[str]:
+    """Non-empty text fields of one OpenAI-compatible `choices` entry, in priority order."""
+    if not isinstance(choice, dict):
+        return
+    for key in ("message", "delta"):
+        inner = choice.get(key)
+        if isinstance(inner, dict):
+            maybe = inner.get("content")
+            if isinstance(maybe, str) and maybe:
+                yield maybe
+    maybe = choice.get("text")
+    if isinstance(maybe, str) and maybe:
+        yield maybe
+
+
 def _extract_text_from_opencode_response(data: object) -> str:
     """Support OpenCode 'parts' responses and OpenAI-compatible 'choices' responses."""
     if not isinstance(data, dict):
         return ""
 
-    parts = data.get("parts")
-    content = _concat_text_parts(parts)
+    content = _concat_text_parts(data.get("parts"))
     if content:
         return content
 
-    info = data.get("info")
-    if isinstance(info, dict):
-        content = _concat_text_parts(info.get("parts"))
-        if content:
-            return content
-        maybe = info.get("content")
-        if isinstance(maybe, str) and maybe:
-            return maybe
-
-    message = data.get("message")
-    if isinstance(message, dict):
-        content = _concat_text_parts(message.get("parts"))
+    # OpenCode nests the assistant message under "info" (or "message" on some versions).
+    for key in ("info", "message"):
+        container = data.get(key)
+        if not isinstance(container, dict):
+            continue
+        content = _concat_text_parts(container.get("parts"))
         if content:
             return content
-        maybe = message.get("content")
+        maybe = container.get("content")
         if isinstance(maybe, str) and maybe:
             return maybe
 
     choices = data.get("choices")
     if isinstance(choices, list):
-        out: list[str] = []
-        for choice in choices:
-            if not isinstance(choice, dict):
-                continue
-            msg = choice.get("message")
-            if isinstance(msg, dict):
-                maybe = msg.get("content")
-                if isinstance(maybe, str) and maybe:
-                    out.append(maybe)
-            delta = choice.get("delta")
-            if isinstance(delta, dict):
-                maybe = delta.get("content")
-                if isinstance(maybe, str) and maybe:
-                    out.append(maybe)
-            maybe_text = choice.get("text")
-            if isinstance(maybe_text, str) and maybe_text:
-                out.append(maybe_text)
-        if out:
-            return "".join(out)
+        return "".join(text for choice in choices for text in _choice_texts(choice))
 
     return ""
 
 
-def _extract_error_from_opencode_response(data: object) -> str | None:
-    """Extract a human-readable error message from an OpenCode message response."""
-    if not isinstance(data, dict):
-        return None
+def _pick_str(value: object) -> str | None:
+    if isinstance(value, str):
+        s = value.strip()
+        return s if s else None
+    return None
 
-    def pick_str(value: object) -> str | None:
-        if isinstance(value, str):
-            s = value.strip()
-            return s if s else None
-        return None
 
-    def msg_from_json_str(raw: str) -> str | None:
-        raw = raw.strip()
-        if not raw:
-            return None
-        try:
-            parsed = json.loads(raw)
-        except Exception:
-            return None
-        if isinstance(parsed, dict):
-            err = parsed.get("error")
-            if isinstance(err, dict):
-                msg = pick_str(err.get("message"))
-                if msg:
-                    return msg
-            msg = pick_str(parsed.get("message")) or pick_str(parsed.get("detail"))
+def _error_message_from_json(raw: str) -> str | None:
+    """Message out of a provider's JSON error body, which OpenCode often keeps as a string."""
+    raw = raw.strip()
+    if not raw:
+        return None
+    try:
+        parsed = _json_loads(raw)
+    except Exception:
+        return None
+    if isinstance(parsed, dict):
+        err = parsed.get("error")
+        if isinstance(err, dict):
+            msg = _pick_str(err.get("message"))
             if msg:
                 return msg
+        msg = _pick_str(parsed.get("message")) or _pick_str(parsed.get("detail"))
+        if msg:
+            return msg
+    return None
+
+
+def _format_opencode_error(err_obj: object) -> str | None:
+    if not isinstance(err_obj, dict):
         return None
+    name = _pick_str(err_obj.get("name")) or "OpenCodeError"
+    data_obj = err_obj.get("data")
+    status = None
+    message = _pick_str(err_obj.get("message"))
+
+    if isinstance(data_obj, dict):
+        status = data_obj.get("statusCode") if isinstance(data_obj.get("statusCode"), int) else None
+        message = _pick_str(data_obj.get("message")) or message
+
+        # When providers return a JSON error payload, OpenCode often stores it as a string.
+        response_body = _pick_str(data_obj.get("responseBody"))
+        if response_body:
+            message = _error_message_from_json(response_body) or message
+
+        meta = data_obj.get("metadata")
+        if isinstance(meta, dict):
+            raw = _pick_str(meta.get("raw"))
+            if raw:
+                message = _error_message_from_json(raw) or message
+
+    if not message:
+        return None
+    prefix = f"{name}"
+    if status is not None:
+        prefix = f"{prefix} ({status})"
+    return f"{prefix}: {message}"
 
-    def coerce(err_obj: object) -> str | None:
-        if not isinstance(err_obj, dict):
-            return None
-        name = pick_str(err_obj.get("name")) or "OpenCodeError"
-        data_obj = err_obj.get("data")
-        status = None
-        message = pick_str(err_obj.get("message"))
-
-        if isinstance(data_obj, dict):
-            status = data_obj.get("statusCode") if isinstance(data_obj.get("statusCode"), int) else None
-            message = pick_str(data_obj.get("message")) or message
-
-            # When providers return a JSON error payload, OpenCode often stores it as a string.
-            response_body = pick_str(data_obj.get("responseBody"))
-            if response_body:
-                message = msg_from_json_str(response_body) or message
-
-            meta = data_obj.get("metadata")
-            if isinstance(meta, dict):
-                raw = pick_str(meta.get("raw"))
-                if raw:
-                    message = msg_from_json_str(raw) or message
-
-        if not message:
-            return None
-        prefix = f"{name}"
-        if status is not None:
-            prefix = f"{prefix} ({status})"
-        return f"{prefix}: {message}"
+
+def _extract_error_from_opencode_response(data: object) -> str | None:
+    """Extract a human-readable error message from an OpenCode message response."""
+    if not isinstance(data, dict):
+        return None
 
     info = data.get("info")
     if isinstance(info, dict):
-        msg = coerce(info.get("error"))
+        msg = _format_opencode_error(info.get("error"))
         if msg:
             return msg
 
-    msg = coerce(data.get("error"))
-    if msg:
-        return msg
-
-    return None
+    return _format_opencode_error(data.get("error"))
 
 
 _NUM_RE = re.compile(r"-?\d+(?:\.\d+)?")
@@ -421,6 +535,12 @@ def _coerce_float(value: Any) -> Optional[float]:
         s = value.strip()
         if not s:
             return None
+        # Plain "120" / "-3.5" (what models usually send) go straight to float(); anything
+        # else ("120g", "1,200", "约 300") takes the regex. The shape check keeps float()
+        # from accepting what the regex would read differently ("1e3", ".5", "nan").
+        head, dot, tail = (s[1:] if s[0] == "-" else s).partition(".")
+        if head.isdecimal() and (not dot or tail.isdecimal()):
+            return float(s)
         m = _NUM_RE.search(s.replace(",", ""))
         if not m:
             return None
@@ -458,6 +578,26 @@ def _as_str_list(value: Any) -> List[str]:
     return [s] if s else []
 
 
+_TOTALS_KEY_MAP = {
+    # Calories
+    "calories": "calories_kcal",
+    "calorie": "calories_kcal",
+    "kcal": "calories_kcal",
+    "energy": "calories_kcal",
+    "energy_kcal": "calories_kcal",
+    # Protein
+    "protein": "protein_g",
+    # Carbs
+    "carbohydrates": "carbs_g",
+    "carbs": "carbs_g",
+    "carb": "carbs_g",
+    # Fat
+    "fat": "fat_g",
+    "lipid": "fat_g",
+}
+_TOTALS_FIELDS = frozenset({"calories_kcal", "protein_g", "carbs_g", "fat_g"})
+
+
 def _normalize_totals(totals: Any) -> Optional[Dict[str, float]]:
     """Normalize totals keys to NutritionTotals schema if possible."""
     if totals is None:
@@ -465,30 +605,12 @@ def _normalize_totals(totals: Any) -> Optional[Dict[str, float]]:
     if not isinstance(totals, dict):
         return None
 
-    key_map = {
-        # Calories
-        "calories": "calories_kcal",
-        "calorie": "calories_kcal",
-        "kcal": "calories_kcal",
-        "energy": "calories_kcal",
-        "energy_kcal": "calories_kcal",
-        # Protein
-        "protein": "protein_g",
-        # Carbs
-        "carbohydrates": "carbs_g",
-        "carbs": "carbs_g",
-        "carb": "carbs_g",
-        # Fat
-        "fat": "fat_g",
-        "lipid": "fat_g",
-    }
-    allowed = {"calories_kcal", "protein_g", "carbs_g", "fat_g"}
     out: Dict[str, float] = {}
     for k, v in totals.items():
         if not isinstance(k, str):
             continue
-        kk = key_map.get(k, k)
-        if kk not in allowed:
+        kk = _TOTALS_KEY_MAP.get(k, k)
+        if kk not in _TOTALS_FIELDS:
             continue
         fv = _coerce_float(v)
         if fv is None:
@@ -497,10 +619,38 @@ def _normalize_totals(totals: Any) -> Optional[Dict[str, float]]:
     return out or None
 
 
-def _first_present(obj: Dict[str, Any], keys: List[str]) -> Any:
-    for k in keys:
-        if k in obj:
-            return obj.get(k)
+# FoodItem field -> accepted keys in priority order. Built into one alias -> (field, rank) map
+# so each item is matched in a single pass over its own keys.
+_ITEM_FIELD_ALIASES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("name", ("name", "food", "item", "dish", "title")),
+    ("portion", ("portion", "serving", "amount", "size", "quantity")),
+    ("grams", ("grams", "gram", "weight_g", "weight", "g")),
+    ("calories_kcal", ("calories_kcal", "calories", "kcal", "energy_kcal", "energy")),
+    ("protein_g", ("protein_g", "protein")),
+    ("carbs_g", ("carbs_g", "carbs", "carbohydrates")),
+    ("fat_g", ("fat_g", "fat", "lipid")),
+    ("confidence", ("confidence", "conf", "score")),
+)
+_ITEM_ALIAS: Dict[str, Tuple[str, int]] = {
+    alias: (field, rank)
+    for field, aliases in _ITEM_FIELD_ALIASES
+    for rank, alias in enumerate(aliases)
+}
+_NUTRIENT_FIELDS = ("calories_kcal", "protein_g", "carbs_g", "fat_g")
+
+
+def _first_alias(found: Dict[str, List[Tuple[int, Any]]], field: str) -> Any:
+    # The highest-priority key present wins, even when its value is unusable.
+    ranked = found.get(field)
+    return ranked[0][1] if ranked else None
+
+
+def _first_alias_number(found: Dict[str, List[Tuple[int, Any]]], field: str) -> Optional[float]:
+    # Numbers fall through to the next key when a value doesn't coerce.
+    for _, value in found.get(field, ()):
+        val = _coerce_float(value)
+        if val is not None:
+            return val
     return None
 
 
@@ -513,34 +663,30 @@ def _normalize_items(items: Any) -> List[Dict[str, Any]]:
         if not isinstance(raw, dict):
             continue
 
-        name = _first_present(raw, ["name", "food", "item", "dish", "title"])
+        found: Dict[str, List[Tuple[int, Any]]] = {}
+        for key, value in raw.items():
+            hit = _ITEM_ALIAS.get(key) if isinstance(key, str) else None
+            if hit is not None:
+                found.setdefault(hit[0], []).append((hit[1], value))
+        for ranked in found.values():
+            if len(ranked) > 1:
+                ranked.sort(key=itemgetter(0))
+
+        name = _first_alias(found, "name")
         if not isinstance(name, str):
             name = str(name) if name is not None else ""
         name = name.strip() or "unknown"
 
-        portion = _first_present(raw, ["portion", "serving", "amount", "size", "quantity"])
+        portion = _first_alias(found, "portion")
         portion_str: Optional[str] = None
         if isinstance(portion, str):
             portion = portion.strip()
             if portion:
                 portion_str = portion
 
-        grams = _coerce_float(_first_present(raw, ["grams", "gram", "weight_g", "weight", "g"]))
-
-        def pick_num(keys: List[str]) -> Optional[float]:
-            for k in keys:
-                if k in raw:
-                    val = _coerce_float(raw.get(k))
-                    if val is not None:
-                        return val
-            return None
-
-        calories = pick_num(["calories_kcal", "calories", "kcal", "energy_kcal", "energy"])
-        protein = pick_num(["protein_g", "protein"])
-        carbs = pick_num(["carbs_g", "carbs", "carbohydrates"])
-        fat = pick_num(["fat_g", "fat", "lipid"])
+        grams = _coerce_float(_first_alias(found, "grams"))
 
-        confidence = pick_num(["confidence", "conf", "score"])
+        confidence = _first_alias_number(found, "confidence")
         if confidence is not None and confidence > 1 and confidence <= 100:
             confidence = confidence / 100.0
         if confidence is not None:
@@ -551,14 +697,10 @@ def _normalize_items(items: Any) -> List[Dict[str, Any]]:
             item["portion"] = portion_str
         if grams is not None:
             item["grams"] = max(0.0, grams)
-        if calories is not None:
-            item["calories_kcal"] = max(0.0, calories)
-        if protein is not None:
-            item["protein_g"] = max(0.0, protein)
-        if carbs is not None:
-            item["carbs_g"] = max(0.0, carbs)
-        if fat is not None:
-            item["fat_g"] = max(0.0, fat)
+        for field in _NUTRIENT_FIELDS:
+            val = _first_alias_number(found, field)
+            if val is not None:
+                item[field] = max(0.0, val)
         if confidence is not None:
             item["confidence"] = confidence
         out.append(item)
@@ -588,134 +730,235 @@ def _normalize_parsed(parsed: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def _data_url(mime: str, image_bytes: bytes) -> str:
-    b64 = base64.b64encode(image_bytes).decode("ascii")
-    return f"data:{mime};base64,{b64}"
-
-
-def recognize_food(
-    *,
-    image_bytes: bytes,
-    image_mime: str,
-    locale: str | None,
-) -> Tuple[DietVisionRawResult, str]:
-    cfg = resolve_vision_settings()
-    log = logging.getLogger(__name__)
-    base = cfg.base_url.rstrip("/")
-    parsed = urlparse(base)
-    root = f"{parsed.scheme}://{parsed.netloc}"
-    session_url = f"{base}/session"
-    if base != root:
-        session_url = f"{root}/session"
-
-    locale_str = locale or "zh-CN"
-
-    system_prompt = (
-        "You are a nutrition assistant. Return STRICT JSON only. "
-        "Do NOT wrap in markdown or code fences. "
-        "Output MUST start with '{' and end with '}'. "
-        "Use double quotes for all keys/strings and no trailing commas. "
-        "Estimate food type and nutrition for the portion shown. "
-        "If unsure, use low confidence and add warnings; do NOT fabricate precise numbers."
-    )
-    user_prompt = (
-        f"Locale: {locale_str}\n"
-        "Task:\n"
-        "1) Identify all foods in the photo.\n"
-        "2) Estimate portion and grams.\n"
-        "3) Estimate nutrition for the consumed portion: calories_kcal, protein_g, carbs_g, fat_g.\n"
-        "4) If you can't identify any food, return items: [] and add a warning.\n"
-        "\n"
-        "Output JSON schema (STRICT):\n"
-        "{\n"
-        '  "items": [\n'
-        "    {\n"
-        '      "name": "string",\n'
-        '      "portion": "string|null",\n'
-        '      "grams": number|null,\n'
-        '      "calories_kcal": number|null,\n'
-        '      "protein_g": number|null,\n'
-        '      "carbs_g": number|null,\n'
-        '      "fat_g": number|null,\n'
-        '      "confidence": number|null\n'
-        "    }\n"
-        "  ],\n"
-        '  "totals": {"calories_kcal": number, "protein_g": number, "carbs_g": number, "fat_g": number} | null,\n'
-        '  "warnings": ["string"]\n'
-        "}\n"
-    )
-
+# Prompts are fixed apart from the locale line, so only that line is built per request.
+_SYSTEM_PROMPT = (
+    "You are a nutrition assistant. Return STRICT JSON only. "
+    "Do NOT wrap in markdown or code fences. "
+    "Output MUST start with '{' and end with '}'. "
+    "Use double quotes for all keys/strings and no trailing commas. "
+    "Estimate food type and nutrition for the portion shown. "
+    "If unsure, use low confidence and add warnings; do NOT fabricate precise numbers."
+)
+_USER_PROMPT_TAIL = (
+    "Task:\n"
+    "1) Identify all foods in the photo.\n"
+    "2) Estimate portion and grams.\n"
+    "3) Estimate nutrition for the consumed portion: calories_kcal, protein_g, carbs_g, fat_g.\n"
+    "4) If you can't identify any food, return items: [] and add a warning.\n"
+    "\n"
+    "Output JSON schema (STRICT):\n"
+    "{\n"
+    '  "items": [\n'
+    "    {\n"
+    '      "name": "string",\n'
+    '      "portion": "string|null",\n'
+    '      "grams": number|null,\n'
+    '      "calories_kcal": number|null,\n'
+    '      "protein_g": number|null,\n'
+    '      "carbs_g": number|null,\n'
+    '      "fat_g": number|null,\n'
+    '      "confidence": number|null\n'
+    "    }\n"
+    "  ],\n"
+    '  "totals": {"calories_kcal": number, "protein_g": number, "carbs_g": number, "fat_g": number} | null,\n'
+    '  "warnings": ["string"]\n'
+    "}\n"
+)
+
+
+def _maybe_downscale(
+    image_bytes: bytes | bytearray | memoryview,
+    mime: str,
+    max_dim: int,
+) -> Tuple[bytes | bytearray | memoryview, str]:
+    """Re-encode images whose longest side exceeds `max_dim` as a smaller JPEG."""
+    if max_dim <= 0 or Image is None:
+        return image_bytes, mime
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            if max(img.size) <= max_dim:
+                return image_bytes, mime
+            # JPEG sources decode straight at a reduced scale instead of full resolution.
+            img.draft("RGB", (max_dim, max_dim))
+            # The re-encode drops EXIF, so bake the orientation into the pixels first.
+            out = ImageOps.exif_transpose(img)
+            if out.mode != "RGB":
+                out = out.convert("RGB")
+            out.thumbnail((max_dim, max_dim), Image.LANCZOS)
+            buf = io.BytesIO()
+            out.save(buf, format="JPEG", quality=85)
+    except Exception:
+        log = logging.getLogger(__name__)
+        log.warning("diet vision downscale failed; sending original image", exc_info=True)
+        return image_bytes, mime
+    return buf.getvalue(), "image/jpeg"
+
+
+# Settings are fixed at import, so the OpenCode request headers are too.
+_HEADERS = {
+    "Content-Type": "application/json",
+    "x-opencode-directory": str(settings.opencode_directory),
+}
+_SESSION_BODY = b'{"title":"diet-vision"}'
+
+
+def _b64encode(image_bytes: bytes | bytearray | memoryview) -> bytes:
+    # b64encode reads any contiguous buffer, so bytearray / memoryview (e.g. ndarray.data)
+    # inputs are never copied to bytes first.
+    if pybase64 is not None and settings.diet_vision_pybase64:
+        return pybase64.b64encode(image_bytes)
+    return base64.b64encode(image_bytes)
+
+
+# Stand-in for the image data URL while the payload goes through orjson. The base64 bytes are
+# spliced in afterwards, so the multi-MB image never exists as a Python str.
+_IMAGE_URL_SLOT = "\x00diet-vision-image\x00"
+_IMAGE_URL_SLOT_JSON = orjson.dumps(_IMAGE_URL_SLOT)
+
+
+@lru_cache(maxsize=64)
+def _message_envelope(agent: str, locale_str: str, mime: str, model: str) -> Tuple[bytes, bytes]:
+    """Serialized message payload split around the image: (head up to the base64, tail after)."""
     payload: Dict[str, Any] = {
-        "system": system_prompt,
+        "system": _SYSTEM_PROMPT,
         # Avoid inheriting the default agent prompt (e.g. clinical) which can break JSON-only output.
-        "agent": cfg.agent,
+        "agent": agent,
         "parts": [
-            {"type": "text", "text": user_prompt},
+            {"type": "text", "text": f"Locale: {locale_str}\n" + _USER_PROMPT_TAIL},
             {
                 "type": "file",
-                "mime": image_mime,
+                "mime": mime,
                 "filename": "meal",
-                "url": _data_url(image_mime, image_bytes),
+                "url": _IMAGE_URL_SLOT,
             },
         ],
     }
-    if "/" in cfg.model:
-        provider_id, model_id = cfg.model.split("/", 1)
+    if "/" in model:
+        provider_id, model_id = model.split("/", 1)
         if provider_id and model_id:
             payload["model"] = {"providerID": provider_id, "modelID": model_id}
+    head, tail = orjson.dumps(payload).split(_IMAGE_URL_SLOT_JSON, 1)
+    # Base64 is JSON-safe as-is; only the mime header needs escaping (drop its closing quote).
+    prefix = orjson.dumps(f"data:{mime};base64,")[:-1]
+    return head + prefix, b'"' + tail
 
-    headers = {
-        "Content-Type": "application/json",
-        "x-opencode-directory": str(settings.opencode_directory),
-    }
 
-    data = None
-    last_error: Exception | None = None
-    with httpx.Client(timeout=cfg.timeout, follow_redirects=True) as client:
-        try:
-            session_resp = client.post(session_url, headers=headers, json={"title": "diet-vision"})
-            session_resp.raise_for_status()
-            session = session_resp.json()
-            session_id = session.get("id") or session.get("session_id")
-            if not session_id:
-                raise RuntimeError("OpenCode session id missing")
-
-            msg_url = f"{session_url}/{session_id}/message"
-
-            def post_message(msg_payload: Dict[str, Any]) -> object:
-                resp = client.post(msg_url, headers=headers, json=msg_payload)
-                content_type = (resp.headers.get("content-type") or "").lower()
-                if resp.status_code >= 400:
-                    resp.raise_for_status()
-                if "text/html" in content_type:
-                    raise RuntimeError("OpenCode API returned HTML")
-                raw = resp.text or ""
-                if not raw.strip():
-                    raise RuntimeError(
-                        "OpenCode message endpoint returned an empty body "
-                        "(agent may be missing; restart opencode to reload .opencode/agents)."
-                    )
-                try:
-                    return resp.json()
-                except Exception as exc:
-                    snippet = raw.replace("\n", " ").strip()[:200]
-                    raise RuntimeError(f"OpenCode returned non-JSON response: {snippet}") from exc
+class _AsyncChunks:
+    """Async byte iterable over fixed chunks; unlike an async generator it can be re-sent."""
+
+    def __init__(self, chunks: Tuple[bytes, ...]) -> None:
+        self._chunks = chunks
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for chunk in self._chunks:
+            yield chunk
+
+
+@dataclass(frozen=True)
+class _VisionRequest:
+    cfg: VisionSettings
+    session_url: str
+    agent: str
+    locale: str
+    image_mime: str
+    image_b64: bytes
+
+    def body(self, agent: str) -> Tuple[Tuple[bytes, bytes, bytes], Dict[str, str]]:
+        """Message body as (head, base64, tail) chunks, plus headers carrying its length."""
+        # Only the image varies between calls: the JSON around it is serialized once per
+        # (agent, locale, mime, model). Sending the chunks as-is with an explicit Content-Length
+        # (so no chunked encoding) avoids joining a second multi-MB copy of the body.
+        head, tail = _message_envelope(agent, self.locale, self.image_mime, self.cfg.model)
+        size = len(head) + len(self.image_b64) + len(tail)
+        return (head, self.image_b64, tail), {**_HEADERS, "Content-Length": str(size)}
+
+    def fallback_agent(self, exc: Exception) -> str:
+        # If a custom agent is misconfigured / not loaded (no file watcher), fall back to a built-in one.
+        if not self.agent or self.agent == "general":
+            raise exc
+        return "general"
+
+    def remember_fallback(self) -> None:
+        _agent_fallback[(self.session_url, self.cfg.agent)] = time.monotonic() + _AGENT_FALLBACK_TTL
+
+
+@lru_cache(maxsize=8)
+def _session_url(base_url: str) -> str:
+    base = base_url.rstrip("/")
+    parsed = urlparse(base)
+    root = f"{parsed.scheme}://{parsed.netloc}"
+    if base != root:
+        return f"{root}/session"
+    return f"{base}/session"
+
+
+def _prepare_request(
+    cfg: VisionSettings,
+    image_bytes: bytes | bytearray | memoryview,
+    image_mime: str,
+    locale: str | None,
+) -> _VisionRequest:
+    session_url = _session_url(cfg.base_url)
+    image_bytes, image_mime = _maybe_downscale(image_bytes, image_mime, cfg.max_dim)
+    return _VisionRequest(
+        cfg=cfg,
+        session_url=session_url,
+        agent=_effective_agent(session_url, cfg.agent),
+        locale=locale or "zh-CN",
+        image_mime=image_mime,
+        # Encoded once: the agent fallback retry reuses it.
+        image_b64=_b64encode(image_bytes),
+    )
 
-            try:
-                data = post_message(payload)
-            except Exception as exc:
-                last_error = exc
-                # If a custom agent is misconfigured / not loaded (no file watcher), fall back to a built-in one.
-                if payload.get("agent") and payload.get("agent") != "general":
-                    payload2 = dict(payload)
-                    payload2["agent"] = "general"
-                    data = post_message(payload2)
-                    last_error = None
-                else:
-                    raise
-        except Exception as exc:
-            last_error = exc
 
+def _session_id(session_resp: httpx.Response) -> str:
+    session_resp.raise_for_status()
+    session = _json_loads(session_resp.content)
+    session_id = session.get("id") or session.get("session_id")
+    if not session_id:
+        raise RuntimeError("OpenCode session id missing")
+    return session_id
+
+
+def _message_data(resp: httpx.Response) -> object:
+    content_type = (resp.headers.get("content-type") or "").lower()
+    if resp.status_code >= 400:
+        resp.raise_for_status()
+    if "text/html" in content_type:
+        raise RuntimeError("OpenCode API returned HTML")
+    # Work on the raw bytes: orjson parses them directly, and only the error path decodes text.
+    body = resp.content
+    if not body.strip():
+        raise RuntimeError(
+            "OpenCode message endpoint returned an empty body "
+            "(agent may be missing; restart opencode to reload .opencode/agents)."
+        )
+    try:
+        return _json_loads(body)
+    except Exception as exc:
+        snippet = resp.text.replace("\n", " ").strip()[:200]
+        raise RuntimeError(f"OpenCode returned non-JSON response: {snippet}") from exc
+
+
+def _construct_result(known: Dict[str, Any]) -> DietVisionRawResult:
+    # _normalize_parsed already emits schema-shaped values: non-empty names, numbers as floats
+    # clamped to >= 0, confidence in [0, 1], warnings as a list of non-empty strings.
+    totals = known["totals"]
+    return DietVisionRawResult.model_construct(
+        items=[FoodItem.model_construct(**item) for item in known["items"]],
+        totals=NutritionTotals.model_construct(**totals) if totals else None,
+        warnings=known["warnings"],
+        extra=known["extra"],
+    )
+
+
+def _build_result(
+    data: object,
+    last_error: Exception | None,
+    *,
+    trust_model: bool = False,
+) -> DietVisionRawResult:
+    log = logging.getLogger(__name__)
     if data is None:
         raise RuntimeError(f"OpenCode vision call failed: {last_error}")
 
@@ -743,7 +986,10 @@ def recognize_food(
 
     known = _normalize_parsed(parsed)
     try:
-        result = DietVisionRawResult.model_validate(known)
+        if trust_model:
+            result = _construct_result(known)
+        else:
+            result = DietVisionRawResult.model_validate(known)
     except Exception as exc:
         # If validation still fails, degrade gracefully.
         fallback = {
@@ -761,14 +1007,100 @@ def recognize_food(
 
     # Ensure totals exist; if model does not provide totals, compute from items.
     if result.totals is None:
-        result.totals = compute_totals([i.model_dump() for i in result.items])
+        result.totals = compute_totals(result.items)
     else:
-        # Normalize rounding.
-        result.totals = NutritionTotals(
-            calories_kcal=round(result.totals.calories_kcal, 1),
-            protein_g=round(result.totals.protein_g, 1),
-            carbs_g=round(result.totals.carbs_g, 1),
-            fat_g=round(result.totals.fat_g, 1),
+        # Normalize rounding. The totals were validated above and rounding keeps them >= 0,
+        # so skip a second validation pass.
+        totals = result.totals
+        result.totals = NutritionTotals.model_construct(
+            calories_kcal=round(totals.calories_kcal, 1),
+            protein_g=round(totals.protein_g, 1),
+            carbs_g=round(totals.carbs_g, 1),
+            fat_g=round(totals.fat_g, 1),
+        )
+
+    return result
+
+
+def recognize_food(
+    *,
+    image_bytes: bytes | bytearray | memoryview,
+    image_mime: str,
+    locale: str | None,
+) -> Tuple[DietVisionRawResult, str]:
+    cfg = resolve_vision_settings()
+    req = _prepare_request(cfg, image_bytes, image_mime, locale)
+
+    data = None
+    last_error: Exception | None = None
+    client = _get_client()
+    try:
+        session_resp = client.post(
+            req.session_url, headers=_HEADERS, content=_SESSION_BODY, timeout=cfg.timeout
         )
+        msg_url = f"{req.session_url}/{_session_id(session_resp)}/message"
+
+        def post_message(agent: str) -> object:
+            chunks, headers = req.body(agent)
+            resp = client.post(msg_url, headers=headers, content=chunks, timeout=cfg.timeout)
+            return _message_data(resp)
+
+        try:
+            data = post_message(req.agent)
+        except Exception as exc:
+            last_error = exc
+            data = post_message(req.fallback_agent(exc))
+            last_error = None
+            req.remember_fallback()
+    except Exception as exc:
+        last_error = exc
+
+    return _build_result(data, last_error, trust_model=cfg.trust_model), cfg.model
+
+
+async def recognize_food_async(
+    *,
+    image_bytes: bytes | bytearray | memoryview,
+    image_mime: str,
+    locale: str | None,
+) -> Tuple[DietVisionRawResult, str]:
+    """`recognize_food` for async callers: the OpenCode round-trips don't hold a worker thread."""
+    cfg = resolve_vision_settings()
+    client = _get_async_client()
+    # The session doesn't depend on the image: open it while a worker thread downscales and
+    # base64-encodes the photo, instead of paying the round-trip after that CPU work.
+    session_task = asyncio.ensure_future(
+        client.post(
+            _session_url(cfg.base_url), headers=_HEADERS, content=_SESSION_BODY, timeout=cfg.timeout
+        )
+    )
+    try:
+        req = await asyncio.to_thread(_prepare_request, cfg, image_bytes, image_mime, locale)
+    except BaseException:
+        session_task.cancel()
+        raise
+
+    data = None
+    last_error: Exception | None = None
+    try:
+        session_resp = await session_task
+        msg_url = f"{req.session_url}/{_session_id(session_resp)}/message"
+
+        async def post_message(agent: str) -> object:
+            chunks, headers = req.body(agent)
+            resp = await client.post(
+                msg_url, headers=headers, content=_AsyncChunks(chunks), timeout=cfg.timeout
+            )
+            return _message_data(resp)
+
+        try:
+            data = await post_message(req.agent)
+        except Exception as exc:
+            last_error = exc
+            data = await post_message(req.fallback_agent(exc))
+            last_error = None
+            req.remember_fallback()
+    except Exception as exc:
+        last_error = exc
 
-    return result, cfg.model
+    return _build_result(data, last_error, trust_model=cfg.trust_model), cfg.model
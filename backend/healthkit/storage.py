@@ -9,6 +9,8 @@ from pathlib import Path
 from typing import Any, Dict, List
 from uuid import uuid4
 
+import orjson
+
 from ..config import settings
 
 def _data_root_for(user_id: str) -> Path:
@@ -38,7 +40,8 @@ def save_sync_data(
         "data": payload,
     }
     file_path = device_dir / f"{sync_id}.json"
-    file_path.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+    # 紧凑 UTF-8 输出（orjson 不转义非 ASCII）；同步载荷可能很大，不做缩进。
+    file_path.write_bytes(orjson.dumps(record))
     return sync_id
 
 
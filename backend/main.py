@@ -1,20 +1,21 @@
 from __future__ import annotations
 
-from datetime import datetime
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Literal, Optional
 
+import orjson
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
 from .config import settings
-from .consensus import recompute_consensus
+from .consensus import iso_now_seconds, recompute_consensus
 from .data_loader import CPETStudyData
-from .db import db_conn, init_db
+from .db import close_pool, db_conn, init_db
 from .replay_data import load_replay_sequence, list_replay_sequences, scan_results_dir
 
 app = FastAPI(
@@ -33,6 +34,22 @@ app.add_middleware(
 # Shared services
 data_store = CPETStudyData(settings.data_file)
 init_db(settings.db_path)
+_preload_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cpet-preload")
+
+
+@app.on_event("startup")
+def _preload_study_data() -> None:
+    # Decode the busiest institutes off the request path. Only as many as the institute caches
+    # hold, so preloading never evicts its own work; a request that arrives first loads on demand.
+    for institute in data_store.busiest_institutes(limit=2):
+        _preload_executor.submit(data_store.warm_institute, institute)
+
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    _preload_executor.shutdown(wait=False, cancel_futures=True)
+    close_pool()
+    data_store.close()
 
 
 class AnnotationRequest(BaseModel):
@@ -41,6 +58,7 @@ class AnnotationRequest(BaseModel):
     at_time_sec: float
     smoothing: Optional[str] = "none"
     notes: Optional[str] = None
+    plan_id: Optional[str] = Field(None, description="Optional plan this annotation belongs to")
 
 
 class AnnotationResponse(BaseModel):
@@ -86,8 +104,10 @@ def get_timeseries(
     views: Optional[str] = None,
     start: Optional[float] = None,
     end: Optional[float] = None,
-) -> dict:
-    """Return smoothed timeseries slices for visualization panels."""
+    precision: Literal["f32", "i16"] = "f32",
+    table: Literal["rows", "columns"] = "rows",
+) -> Response:
+    """Return smoothed timeseries slices for visualization panels (``table=columns``: one array per column)."""
     view_list = views.split(",") if views else []
     try:
         payload = data_store.build_timeseries_payload(
@@ -96,10 +116,35 @@ def get_timeseries(
             start=start,
             end=end,
             views=view_list,
+            precision=precision,
+            table_layout=table,
         )
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc))
-    return payload
+    # Panel series are NumPy arrays: encode them directly instead of boxing every sample.
+    return Response(
+        content=orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        media_type="application/json",
+    )
+
+
+@app.get("/api/exams/{exam_id}/timeseries.arrows")
+def get_timeseries_arrow(
+    exam_id: str,
+    smooth: str = "sec:10",
+    views: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> StreamingResponse:
+    """Same data as /timeseries as an Arrow IPC stream (one float32 column per signal)."""
+    view_list = views.split(",") if views else []
+    try:
+        chunks = data_store.timeseries_arrow_stream(exam_id, smooth=smooth, start=start, end=end, views=view_list)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+    return StreamingResponse(chunks, media_type="application/vnd.apache.arrow.stream")
 
 
 @app.post("/api/exams/{exam_id}/annotations", response_model=AnnotationResponse)
@@ -110,8 +155,8 @@ def save_annotation(exam_id: str, request: AnnotationRequest) -> AnnotationRespo
     with db_conn(settings.db_path) as conn:
         conn.execute(
             """
-            INSERT INTO annotations (exam_id, reader_id, role, at_time, smoothing, notes, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO annotations (exam_id, reader_id, role, at_time, smoothing, notes, created_at, plan_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 exam_id,
@@ -120,7 +165,8 @@ def save_annotation(exam_id: str, request: AnnotationRequest) -> AnnotationRespo
                 float(request.at_time_sec),
                 request.smoothing,
                 request.notes,
-                datetime.utcnow().isoformat(timespec="seconds"),
+                iso_now_seconds(),
+                request.plan_id,
             ),
         )
         state = recompute_consensus(conn, exam_id, settings.delta_sec)
@@ -37,10 +37,10 @@ def get_device_nutrition_summary(user_id: str, device_id: str, *, start: str, en
         for d in data.get("days", [])
     ]
 
-    # Compute last entry time within range.
+    # Compute last entry time within range (entries come newest first, so one row is enough).
     last_entry_at: Optional[str] = None
     try:
-        entries = _get_device_entries(user_id, device_id, start=start, end=end)
+        entries = _get_device_entries(user_id, device_id, start=start, end=end, limit=1)
         for e in entries:
             eaten_at = getattr(e, "eaten_at", None)
             if eaten_at and (not last_entry_at or eaten_at > last_entry_at):
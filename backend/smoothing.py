@@ -6,6 +6,11 @@ from typing import Tuple
 import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - optional dependency
+    njit = None
+
 
 def parse_smoothing(smooth: str) -> Tuple[str, int]:
     key = (smooth or "").lower().strip()
@@ -22,6 +27,63 @@ def parse_smoothing(smooth: str) -> Tuple[str, int]:
     return "none", 0
 
 
+if njit is not None:
+
+    @njit(cache=True, parallel=True)
+    def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+        """Trailing mean over ``window`` rows per column, skipping NaN (pandas ``min_periods=1``)."""
+        n_rows, n_cols = values.shape
+        out = np.empty((n_rows, n_cols))
+        for c in prange(n_cols):
+            # Same incremental scheme as pandas' roll_mean (so results match rolling().mean()):
+            # separately Kahan-compensated adds and removes, a run of identical values is reported
+            # exactly, and the sign of an all-negative/all-positive window is preserved.
+            total = 0.0
+            comp_add = 0.0
+            comp_remove = 0.0
+            count = 0
+            negative = 0
+            prev = values[0, c] if n_rows else np.nan
+            same = 0
+            for i in range(n_rows):
+                if i >= window:
+                    v = values[i - window, c]
+                    if not np.isnan(v):
+                        count -= 1
+                        y = -v - comp_remove
+                        t = total + y
+                        comp_remove = t - total - y
+                        total = t
+                        if np.signbit(v):
+                            negative -= 1
+                v = values[i, c]
+                if not np.isnan(v):
+                    count += 1
+                    y = v - comp_add
+                    t = total + y
+                    comp_add = t - total - y
+                    total = t
+                    if np.signbit(v):
+                        negative += 1
+                    same = same + 1 if v == prev else 1
+                    prev = v
+                if count == 0:
+                    out[i, c] = np.nan
+                elif same >= count:
+                    out[i, c] = prev
+                else:
+                    mean = total / count
+                    if negative == 0 and mean < 0:
+                        mean = 0.0
+                    elif negative == count and mean > 0:
+                        mean = 0.0
+                    out[i, c] = mean
+        return out
+
+else:
+    _rolling_mean = None
+
+
 def apply_smoothing(df: pd.DataFrame, smooth: str) -> pd.DataFrame:
     """Apply breath-based rolling or time-based resample smoothing."""
     mode, window = parse_smoothing(smooth)
@@ -33,6 +95,11 @@ def apply_smoothing(df: pd.DataFrame, smooth: str) -> pd.DataFrame:
     time_col = "Time"
 
     if mode == "breath":
+        if _rolling_mean is not None and numeric_cols:
+            # Columns are independent: one contiguous float64 column per parallel kernel lane.
+            values = np.asfortranarray(working[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan))
+            working[numeric_cols] = _rolling_mean(values, window)
+            return working
         working[numeric_cols] = (
             working[numeric_cols].rolling(window=window, min_periods=1).mean()
         )
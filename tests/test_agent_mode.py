@@ -31,6 +31,11 @@ class TestAgentMode(unittest.TestCase):
                 sys.modules.pop(name, None)
 
         from backend.api import app  # noqa: WPS433 (import inside test for env control)
+        from backend.clinical import storage as clinical_storage  # noqa: WPS433
+
+        # Clinical files live under the repo's data/ dir; keep the test's writes in the tmp dir.
+        clinical_storage._SUBJECTS_DIR = cls._tmp / "clinical" / "subjects"
+        clinical_storage._RECORDS_DIR = cls._tmp / "clinical" / "records"
 
         cls.client = TestClient(app)
 
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from fastapi.testclient import TestClient
+
+
+class TestClinicalRecordsApi(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._tmp = Path(tempfile.mkdtemp(prefix="xinhui-test-"))
+        data_root = cls._tmp / "data"
+        os.environ["XINHUI_DATA_ROOT"] = str(data_root)
+        os.environ["XINHUI_DB_PATH"] = str(data_root / "xinhui.db")
+        os.environ["XINHUI_JWT_SECRET"] = "test-secret"
+
+        for name in list(sys.modules.keys()):
+            if name.startswith("backend."):
+                sys.modules.pop(name, None)
+
+        from backend.api import app  # noqa: WPS433 (import inside test for env control)
+        from backend.clinical import storage  # noqa: WPS433
+
+        # Clinical files live under the repo's data/ dir; keep the test's writes in the tmp dir.
+        storage._SUBJECTS_DIR = cls._tmp / "clinical" / "subjects"
+        storage._RECORDS_DIR = cls._tmp / "clinical" / "records"
+        cls.storage = storage
+
+        cls.client = TestClient(app)
+        email = "clinical@example.com"
+        password = "password123"
+        cls.client.post("/api/auth/register", json={"email": email, "password": password})
+        resp = cls.client.post("/api/auth/login", json={"email": email, "password": password})
+        assert resp.status_code == 200, resp.text
+        cls.user_id = cls.client.get("/api/auth/me").json()["id"]
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        try:
+            cls.client.close()
+        except Exception:
+            pass
+        shutil.rmtree(cls._tmp, ignore_errors=True)
+
+    def _record(self, patient_id: str, recorded_at: str = "2024-05-01T08:00:00") -> dict:
+        return {"patient_id": patient_id, "record_type": "note", "recorded_at": recorded_at}
+
+    def test_foreign_patient_id_forbidden_on_every_body_endpoint(self) -> None:
+        cases = [
+            ("/api/clinical/subjects", {"patient_id": "someone-else"}),
+            ("/api/clinical/records", self._record("someone-else")),
+            ("/api/clinical/records/bulk", {"records": [self._record("someone-else")]}),
+        ]
+        for path, body in cases:
+            with self.subTest(path=path):
+                resp = self.client.post(path, json=body)
+                self.assertEqual(resp.status_code, 403)
+        self.assertIsNone(self.storage.get_subject("someone-else"))
+        self.assertEqual(self.storage.list_records("someone-else"), [])
+
+    def test_handlers_check_validated_patient_id(self) -> None:
+        # With the body-peeking guards swapped for plain auth, the handlers must still refuse.
+        from fastapi import Depends  # noqa: WPS433
+
+        from backend.api import app  # noqa: WPS433
+        from backend.auth.security import get_current_user  # noqa: WPS433
+        from backend.clinical import api as clinical_api  # noqa: WPS433
+
+        def auth_only(user: dict = Depends(get_current_user)) -> dict:
+            return user
+
+        app.dependency_overrides[clinical_api._require_self_body] = auth_only
+        app.dependency_overrides[clinical_api._require_self_bulk] = auth_only
+        try:
+            self.test_foreign_patient_id_forbidden_on_every_body_endpoint()
+        finally:
+            app.dependency_overrides.clear()
+
+    def test_records_key_does_not_bypass_single_body_guard(self) -> None:
+        body = {**self._record("victim"), "records": []}
+        resp = self.client.post("/api/clinical/records", json=body)
+        self.assertEqual(resp.status_code, 403)
+        body = {"patient_id": "victim2", "records": []}
+        resp = self.client.post("/api/clinical/subjects", json=body)
+        self.assertEqual(resp.status_code, 403)
+        self.assertIsNone(self.storage.get_subject("victim2"))
+        self.assertEqual(self.storage.list_records("victim"), [])
+
+    def test_bulk_rejects_foreign_item(self) -> None:
+        body = {"records": [self._record(self.user_id), self._record("victim3")]}
+        resp = self.client.post("/api/clinical/records/bulk", json=body)
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(self.storage.list_records("victim3"), [])
+
+        body = {"records": [self._record(self.user_id)]}
+        resp = self.client.post("/api/clinical/records/bulk", json=body)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["count"], 1)
+
+    def test_cached_subject_is_not_shared(self) -> None:
+        from backend.clinical.models import ClinicalSubjectUpsertRequest  # noqa: WPS433
+
+        upsert = self.storage.upsert_subject
+        upsert(ClinicalSubjectUpsertRequest(patient_id="cache-1", diagnosis=["a"]))
+        first = self.storage.get_subject("cache-1")
+        first.diagnosis.append("mutated")
+        self.assertEqual(self.storage.get_subject("cache-1").diagnosis, ["a"])
+
+        # A write must be visible right away, not after the cache TTL.
+        upsert(ClinicalSubjectUpsertRequest(patient_id="cache-1", diagnosis=["b"]))
+        self.assertEqual(self.storage.get_subject("cache-1").diagnosis, ["b"])
+
+    def test_cache_refuses_stale_fill_and_evicts_oldest(self) -> None:
+        storage = self.storage
+        # A reader that read before a write finished must not cache what it read.
+        key = ("subject", "cache-2", "")
+        generation = storage._cache_generation("cache-2")
+        storage._cache_invalidate("cache-2")
+        storage._cache_put(key, b"{}", generation)
+        self.assertIs(storage._cache_get(key), storage._MISS)
+
+        original = storage._CACHE_MAX_ENTRIES
+        storage._CACHE_MAX_ENTRIES = 2
+        try:
+            for patient_id in ("evict-1", "evict-2", "evict-3"):
+                gen = storage._cache_generation(patient_id)
+                storage._cache_put(("subject", patient_id, ""), None, gen)
+            self.assertIs(storage._cache_get(("subject", "evict-1", "")), storage._MISS)
+            self.assertIsNone(storage._cache_get(("subject", "evict-3", "")))
+        finally:
+            storage._CACHE_MAX_ENTRIES = original
+
+    def test_bulk_create_round_trip(self) -> None:
+        from backend.clinical.models import ClinicalRecordCreateRequest  # noqa: WPS433
+
+        requests = [
+            ClinicalRecordCreateRequest(**self._record("bulk-1", f"2024-05-0{day}T08:00:00"))
+            for day in (1, 3, 2)
+        ]
+        created = self.storage.create_records(requests)
+        self.assertEqual(len(created), 3)
+
+        listed = self.storage.list_records("bulk-1")
+        days = [r.recorded_at[:10] for r in listed]
+        self.assertEqual(days, ["2024-05-03", "2024-05-02", "2024-05-01"])
+        for record in created:
+            got = self.storage.get_record("bulk-1", record.record_id)
+            self.assertEqual(got, record)
+        # Dashed and hex spellings of a UUID address the same row.
+        dashed = str(UUID(created[0].record_id))
+        self.assertEqual(self.storage.get_record("bulk-1", dashed), created[0])
+
+    def test_bulk_endpoint_caps_items(self) -> None:
+        body = {"records": [self._record(self.user_id)] * 501}
+        resp = self.client.post("/api/clinical/records/bulk", json=body)
+        self.assertEqual(resp.status_code, 422)
+
+    def _write_legacy(self, patient_id: str, record_id: str, title: str) -> None:
+        patient_dir = self.storage._patient_records_dir(patient_id)
+        patient_dir.mkdir(parents=True, exist_ok=True)
+        record = {
+            **self._record(patient_id),
+            "record_id": record_id,
+            "title": title,
+            "created_at": "2024-05-01T09:00:00Z",
+        }
+        (patient_dir / f"{record_id}.json").write_text(json.dumps(record), encoding="utf-8")
+
+    def test_legacy_records_imported_once(self) -> None:
+        uuid_id = uuid4().hex
+        self._write_legacy("legacy-1", uuid_id, "uuid")
+        self._write_legacy("legacy-1", "hand-written", "non-uuid")
+
+        listed = self.storage.list_records("legacy-1")
+        self.assertEqual(sorted(r.title for r in listed), ["non-uuid", "uuid"])
+        self.assertEqual(self.storage.get_record("legacy-1", "hand-written").title, "non-uuid")
+        self.assertEqual(self.storage.get_record("legacy-1", uuid_id).title, "uuid")
+
+        # A later process sees the files again but must not re-import rows it already has.
+        self._write_legacy("legacy-1", "hand-written", "edited")
+        self.storage._indexed_patients.discard("legacy-1")
+        listed = self.storage.list_records("legacy-1")
+        self.assertEqual(sorted(r.title for r in listed), ["non-uuid", "uuid"])
+
+        self.assertTrue(self.storage.delete_record("legacy-1", "hand-written"))
+        self.storage._indexed_patients.discard("legacy-1")
+        self.assertEqual([r.title for r in self.storage.list_records("legacy-1")], ["uuid"])
+
+    def test_list_records_stream_matches_response_model(self) -> None:
+        from backend.clinical.models import ClinicalRecordsResponse  # noqa: WPS433
+
+        for day in (1, 2, 3):
+            body = self._record(self.user_id, f"2024-06-0{day}T08:00:00")
+            self.assertEqual(self.client.post("/api/clinical/records", json=body).status_code, 200)
+
+        params = {"start": "2024-06-01", "end": "2024-06-02"}
+        resp = self.client.get(f"/api/clinical/records/{self.user_id}", params=params)
+        self.assertEqual(resp.status_code, 200)
+        parsed = ClinicalRecordsResponse.model_validate_json(resp.content)
+        self.assertEqual(parsed.patient_id, self.user_id)
+        self.assertEqual(parsed.count, 2)
+        self.assertEqual([r.recorded_at[:10] for r in parsed.records], ["2024-06-02", "2024-06-01"])
+
+    def test_list_records_storage_failure_is_5xx(self) -> None:
+        from backend.api import app  # noqa: WPS433
+
+        def broken(patient_id: str) -> None:
+            raise RuntimeError("database is locked")
+
+        original = self.storage._backfill_index
+        self.storage._backfill_index = broken
+        client = TestClient(app, raise_server_exceptions=False, cookies=self.client.cookies)
+        try:
+            resp = client.get(f"/api/clinical/records/{self.user_id}")
+        finally:
+            self.storage._backfill_index = original
+            client.close()
+        self.assertEqual(resp.status_code, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import importlib.util
+import pickle
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import h5py
+import numpy as np
+import orjson
+import pandas as pd
+
+from backend.data_loader import CPETStudyData
+
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def _write_pickled(group: h5py.Group, name: str, df: pd.DataFrame) -> None:
+    group.create_dataset(name, data=np.frombuffer(pickle.dumps(df), dtype=np.uint8))
+
+
+def _build_study(path: Path) -> None:
+    """Tiny two-exam institute in the pickle-in-HDF5 layout."""
+    rows = []
+    for exam_id, n in (("exam-a", 5), ("exam-b", 3)):
+        for i in range(n):
+            rows.append(
+                {
+                    "Examination_ID": exam_id,
+                    "Time": float(i * 10),
+                    "VO2": 1000.0 + i,
+                    "VCO2": 900.0 + i,
+                    "HR": 80.0 + i,
+                    "Load_Phase": "rest" if i < 2 else "exercise",
+                    # Past float32's exact-integer range, to catch a lossy round trip.
+                    "Power_Load": (1 << 25) + 1 + i,
+                    "Marker": i % 2 == 0,
+                }
+            )
+    features = pd.DataFrame(rows)
+    metadata = pd.DataFrame({"Examination_ID": ["exam-a", "exam-b"], "Age": [40, 55]})
+    with h5py.File(path, "w") as h5:
+        group = h5.create_group("institutes").create_group("inst-1")
+        _write_pickled(group, "features", features)
+        _write_pickled(group, "metadata", metadata)
+        group.create_dataset("exam_ids", data=["exam-a", "exam-b"], dtype=h5py.string_dtype())
+
+
+class TestCPETStudyData(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = Path(tempfile.mkdtemp(prefix="xinhui-test-"))
+        self.data_file = self._tmp / "study.h5"
+        _build_study(self.data_file)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+    @unittest.skipUnless(_HAS_PYARROW, "pyarrow not installed")
+    def test_arrow_tables_round_trip(self) -> None:
+        study = CPETStudyData(self.data_file)
+        expected = study.load_exam_dataframe("exam-a")
+        written = study.export_arrow_tables()
+        study.close()
+
+        arrow_dir = self._tmp / "study.h5.arrow"
+        paths = [arrow_dir / "inst-1" / f"{name}.arrow" for name in ("features", "metadata")]
+        self.assertEqual(sorted(written), paths)
+        # A sibling file differing only by extension gets its own directory.
+        sibling = shutil.copy(self.data_file, self._tmp / "study.hdf5")
+        self.assertEqual(CPETStudyData(Path(sibling)).arrow_dir, self._tmp / "study.hdf5.arrow")
+
+        reloaded = CPETStudyData(self.data_file)
+        self.assertIsNotNone(reloaded._read_arrow_table("inst-1", "features"))
+        pd.testing.assert_frame_equal(reloaded.load_exam_dataframe("exam-a"), expected)
+        self.assertEqual(reloaded.load_exam_metadata("exam-b")["Age"], 55)
+        reloaded.close()
+
+    def test_chunked_features_keep_int_and_bool_dtypes(self) -> None:
+        study = CPETStudyData(self.data_file)
+        expected = study.load_exam_dataframe("exam-a")
+        self.assertEqual(study.export_chunked_features(), ["inst-1"])
+
+        migrated = CPETStudyData(self.data_file)
+        self.assertIsNotNone(migrated._chunked_layout("inst-1"))
+        frame = migrated.load_exam_dataframe("exam-a")
+        self.assertEqual(list(frame.columns), list(expected.columns))
+        for col in ("Power_Load", "Marker", "Load_Phase", "Examination_ID"):
+            pd.testing.assert_series_equal(frame[col], expected[col])
+        np.testing.assert_allclose(frame["VO2"], expected["VO2"])
+
+        # JSON output keeps the int as an int rather than a rounded float.
+        row = migrated.build_timeseries_payload("exam-a")["table"][0]
+        encoded = orjson.dumps(row, option=orjson.OPT_SERIALIZE_NUMPY)
+        self.assertIn(b'"Power_Load":33554433,', encoded)
+        migrated.close()
+
+    @unittest.skipUnless(_HAS_PYARROW, "pyarrow not installed")
+    def test_timeseries_arrow_stream_matches_json_payload(self) -> None:
+        import pyarrow as pa  # noqa: WPS433
+
+        study = CPETStudyData(self.data_file)
+        chunks = list(study.timeseries_arrow_stream("exam-a", views=["panel5"], batch_rows=2))
+        self.assertGreater(len(chunks), 1)
+        table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+
+        meta = {k.decode(): v for k, v in table.schema.metadata.items()}
+        self.assertEqual(meta["exam_id"], b"exam-a")
+        self.assertEqual(float(meta["duration_sec"]), 40.0)
+        views = orjson.loads(meta["views"])
+        self.assertEqual(set(views), {"panel5", "vslope"})
+        self.assertEqual(views["panel5"], {"time_sec": "Time", "vo2": "VO2", "vco2": "VCO2"})
+
+        payload = study.build_timeseries_payload("exam-a", views=["panel5"])
+        self.assertEqual(table.num_rows, len(payload["table"]))
+        panel = payload["views"]["panel5"]
+        for key, col in views["panel5"].items():
+            expected = np.asarray(panel[key], dtype=np.float32)
+            np.testing.assert_allclose(table.column(col).to_numpy(), expected)
+        phases = [row["Load_Phase"] for row in payload["table"]]
+        self.assertEqual(table.column("Load_Phase").to_pylist(), phases)
+        # Table columns the exam lacks are all-null, not dropped.
+        self.assertEqual(table.column("VE").null_count, table.num_rows)
+        study.close()
+
+        with self.assertRaises(KeyError):
+            CPETStudyData(self.data_file).timeseries_arrow_stream("missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
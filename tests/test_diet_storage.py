@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+class TestDietStorage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._tmp = Path(tempfile.mkdtemp(prefix="xinhui-test-"))
+        data_root = cls._tmp / "data"
+        os.environ["XINHUI_DATA_ROOT"] = str(data_root)
+        os.environ["XINHUI_DB_PATH"] = str(data_root / "xinhui.db")
+
+        for name in list(sys.modules.keys()):
+            if name.startswith("backend."):
+                sys.modules.pop(name, None)
+
+        from backend.app_db import init_app_db  # noqa: WPS433 (import inside test for env control)
+        from backend.config import settings  # noqa: WPS433
+        from backend.diet import storage  # noqa: WPS433
+
+        settings.data_root.mkdir(parents=True, exist_ok=True)
+        init_app_db(settings.app_db_path)
+        cls.storage = storage
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls._tmp, ignore_errors=True)
+
+    def _entry(self, device_id: str, eaten_at: str, plan_id: str | None = None):
+        return self.storage.create_entry_record(
+            device_id=device_id,
+            eaten_at=eaten_at,
+            meal_type="lunch",
+            items=[{"name": "rice", "calories_kcal": 200.0}],
+            notes=None,
+            source="manual",
+            warnings=[],
+            plan_id=plan_id,
+        )
+
+    def test_save_then_list_newest_first(self) -> None:
+        saved = [
+            self._entry("dev-1", "2024-05-01T12:00:00", plan_id="p1"),
+            self._entry("dev-1", "2024-05-03T12:00:00"),
+            self._entry("dev-1", "2024-05-02T12:00:00", plan_id="p1"),
+        ]
+        for entry in saved:
+            self.storage.save_entry("user-1", entry)
+
+        entries = self.storage.get_device_entries("user-1", "dev-1")
+        days = [e.eaten_at[:10] for e in entries]
+        self.assertEqual(days, ["2024-05-03", "2024-05-02", "2024-05-01"])
+        self.assertEqual(entries[0].entry_id, saved[1].entry_id)
+        self.assertEqual(entries[0].totals.calories_kcal, 200.0)
+
+        # plan_id filters with or without a date range.
+        by_plan = self.storage.get_device_entries("user-1", "dev-1", plan_id="p1")
+        self.assertEqual([e.eaten_at[:10] for e in by_plan], ["2024-05-02", "2024-05-01"])
+        ranged = self.storage.get_device_entries(
+            "user-1", "dev-1", start="2024-05-02", end="2024-05-03", plan_id="p1"
+        )
+        self.assertEqual([e.eaten_at[:10] for e in ranged], ["2024-05-02"])
+        self.assertEqual(self.storage.count_device_entries("user-1", "dev-1", plan_id="p1"), 2)
+
+    def test_legacy_files_imported_and_malformed_skipped(self) -> None:
+        root = self._tmp / "legacy"
+        device_dir = root / "dev-2"
+        device_dir.mkdir(parents=True)
+        legacy = self._entry("dev-2", "2024-04-01T08:00:00")
+        (device_dir / f"{legacy.entry_id}.json").write_text(
+            json.dumps(legacy.model_dump(mode="json")), encoding="utf-8"
+        )
+        (device_dir / "broken.json").write_text("{not json", encoding="utf-8")
+
+        entries = self.storage.get_device_entries("user-2", "dev-2", data_root=root)
+        self.assertEqual([e.entry_id for e in entries], [legacy.entry_id])
+
+        # A later process re-scans the directory but must not duplicate imported rows.
+        self.storage._indexed_devices.clear()
+        self.assertEqual(self.storage.count_device_entries("user-2", "dev-2", data_root=root), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
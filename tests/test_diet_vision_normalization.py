@@ -5,7 +5,7 @@ from __future__ import annotations
 import unittest
 
 from backend.diet.models import DietVisionRawResult
-from backend.diet.vision import _normalize_parsed
+from backend.diet.vision import _normalize_parsed, _parse_model_output_json, _sanitize_json_like
 
 
 class TestDietVisionNormalization(unittest.TestCase):
@@ -62,6 +62,15 @@ class TestDietVisionNormalization(unittest.TestCase):
         self.assertEqual(result.items[0].confidence, 0.8)
         self.assertEqual(result.warnings, ["test"])
 
+    def test_non_finite_numbers_become_null(self) -> None:
+        self.assertEqual(
+            _sanitize_json_like('{"a": -Infinity, "b": NaN, "c": Infinity, "d": "xNaN"}'),
+            '{"a": null, "b": null, "c": null, "d": "xNaN"}',
+        )
+        # The trailing comma forces the sanitized retry, which must now parse.
+        parsed = _parse_model_output_json('结果: {"items": [], "totals": {"fat_g": -Infinity,}} 完')
+        self.assertEqual(parsed, {"items": [], "totals": {"fat_g": None}})
+
 
 if __name__ == "__main__":
     unittest.main()